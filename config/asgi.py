@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Serve the async versions of the read-only views (see core.async_views)
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'config.asgi_urls')
 
 application = get_asgi_application()
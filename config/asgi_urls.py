@@ -0,0 +1,12 @@
+"""
+URL configuration used under ASGI (see config/asgi.py): config.urls with
+core's read-only views replaced by their async versions.
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path("accounts/", include("django.contrib.auth.urls")),
+    path("", include("core.async_urls")),
+]
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -31,6 +34,18 @@ LOGOUT_REDIRECT_URL = "/"
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = "noreply@automation-dashboard.local"
 
+# Overdue tasks are reminded again once this many days have started since
+# their last reminder (1 = once per calendar day, however often cron runs)
+REMINDER_REPEAT_DAYS = 1
+
+# task_list keyset pagination; ?page_size= may ask for up to the maximum
+TASK_LIST_PAGE_SIZE = 50
+TASK_LIST_MAX_PAGE_SIZE = 200
+
+# JSON API (/api/tasks/) page sizes
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+
 ALLOWED_HOSTS = []
 
 
@@ -47,20 +62,67 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so every other middleware's queries are counted too
+    'core.middleware.ServerTimingMiddleware',
+    # before anything that reads, so pinned requests read from default
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # AuthenticationMiddleware, reading the user from the sessions cache
+    'core.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'config.urls'
+# config/asgi.py switches this to config.asgi_urls, which serves the
+# read-only views in their async versions
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'config.urls')
+
+# ServerTimingMiddleware: send query count and db/template/total time in a
+# Server-Timing header (visible in the browser's network panel)
+SERVER_TIMING_HEADER = True
+
+# Per-URL-name budgets for GET (and other read-only) requests; requests
+# over them are logged as warnings by core.middleware. "*" covers every
+# other route. The query budgets are also asserted for every route in
+# core.urls by the test suite.
+REQUEST_BUDGETS = {
+    "*": {"queries": 10, "ms": 500},
+    # session + user + one query for the page; the session and user come
+    # from the cache under the memory and file SESSION_PROFILEs
+    "task_list": {"queries": 5, "ms": 300},
+    "stats": {"queries": 5, "ms": 300},
+    "stats_productivity": {"queries": 5, "ms": 200},
+    "api_task_list": {"queries": 5, "ms": 300},
+    "api_task_detail": {"queries": 5, "ms": 200},
+    "task_export": {"queries": 5, "ms": 200},
+}
+# The same for POST, PUT, PATCH and DELETE requests, which also keep the
+# rollups, caches and sessions in step.
+REQUEST_WRITE_BUDGETS = {
+    "*": {"queries": 15, "ms": 1000},
+    # session + user + the INSERT and its DailyCompletion upsert
+    "api_task_list": {"queries": 4, "ms": 300},
+}
+
+# /metrics (Prometheus text) is open to staff users and to these client
+# addresses. Behind a reverse proxy REMOTE_ADDR is the proxy, so only list
+# addresses that cannot be reached from outside.
+METRICS_ALLOWED_IPS = []
+
+# With several worker processes, each writes its metrics here and /metrics
+# adds them up; leave unset for a single process. Use a directory local to
+# the host: files of exited processes are recognised by their pid, and
+# folded into one file on the next scrape.
+METRICS_DIR = os.environ.get("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = 5  # seconds
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, plus render timing for the Server-Timing header
+        'BACKEND': 'core.timing.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,10 +145,137 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {
+            # take the write lock when a transaction starts, so a transaction
+            # that reads first waits for busy_timeout instead of failing with
+            # "database is locked" when it goes on to write
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Read replica of default; locally a copy kept current by
+    # ./manage.py sync_replica. Only used when listed in READ_REPLICAS.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Aliases that are copies of default: never migrated, refreshed by
+# sync_replica
+REPLICA_DATABASES = ['replica']
+
+# Replicas the list and stats reads are spread over (see core.routers);
+# empty reads everything from default. DJANGO_READ_REPLICAS=replica
+# turns the local one on.
+READ_REPLICAS = [
+    alias for alias in os.environ.get('DJANGO_READ_REPLICAS', '').split(',') if alias
+]
+
+# After a request writes, the client reads from default for this long, so
+# its own changes are visible before the replicas catch up. Keep it above
+# the replication lag (the sync_replica interval locally).
+REPLICA_PIN_SECONDS = 30
+
+# Applied to every new SQLite connection by core.db, in this order; check
+# with ./manage.py sqlite_pragmas. Run ./manage.py optimize_db from cron
+# (e.g. hourly) to keep the query planner's statistics current.
+SQLITE_PRAGMAS = {
+    # readers no longer block on the writer, and commits are cheaper
+    'journal_mode': 'wal',
+    # with WAL, only a power loss can lose the last commits; never corrupts
+    'synchronous': 'normal',
+    # milliseconds a connection waits for a lock before "database is locked"
+    'busy_timeout': 5000,
+    # bytes of the file read through memory mapping (256 MiB)
+    'mmap_size': 268435456,
+    # page cache per connection; negative is KiB (64 MiB)
+    'cache_size': -65536,
+    'temp_store': 'memory',
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Stats are invalidated through this cache (per-user versions, also behind
+# the productivity ETags), so every process must see the same one
+# (DJANGO_CACHE_PROFILE):
+#   "file"   - (default) a file cache in CACHE_DIR, shared by all processes
+#              on the host. Across hosts, point it at memcached or redis.
+#   "memory" - this process's memory; other processes keep serving stale
+#              stats after a write, so only opt into it with a single process.
+CACHE_PROFILE = os.environ.get('DJANGO_CACHE_PROFILE', 'file')
+if CACHE_PROFILE == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / 'cache' / 'default'),
+            # stats and task row fragments for every active user
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+elif CACHE_PROFILE == 'memory':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    raise ImproperlyConfigured('DJANGO_CACHE_PROFILE must be file or memory')
+
+# Session/auth profile (DJANGO_SESSION_PROFILE):
+#   "file"   - (default) cached_db sessions, and the logged-in user cached
+#              for AUTH_USER_CACHE_TIMEOUT, on a file cache in
+#              SESSION_CACHE_DIR shared by all processes on the host.
+#   "memory" - the same in this process's memory. Logouts and password
+#              changes are only seen by the process that made them, so only
+#              opt into it with a single process.
+#   "db"     - Django's defaults: a session and a user query per request.
+SESSION_PROFILE = os.environ.get('DJANGO_SESSION_PROFILE', 'file')
+if SESSION_PROFILE == 'memory':
+    CACHES['sessions'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+    }
+elif SESSION_PROFILE == 'file':
+    CACHES['sessions'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('SESSION_CACHE_DIR', BASE_DIR / 'cache' / 'sessions'),
+    }
+elif SESSION_PROFILE != 'db':
+    raise ImproperlyConfigured('DJANGO_SESSION_PROFILE must be memory, file or db')
+
+if 'sessions' in CACHES:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'sessions'
+    # seconds; user changes are seen at once anyway (see core.auth)
+    AUTH_USER_CACHE_TIMEOUT = 5 * 60
+else:
+    AUTH_USER_CACHE_TIMEOUT = 0
+
+STATS_CACHE_TIMEOUT = 60 * 60
+
+# Rendered task_list rows; keys change with the task and the date anyway
+TASK_ROW_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Background jobs (core.jobs), run by ./manage.py run_worker
+JOB_MAX_ATTEMPTS = 5
+# seconds before the first retry; doubles with each further attempt
+JOB_RETRY_BACKOFF = 10
+JOB_RETRY_BACKOFF_MAX = 60 * 60
+# a job still running after this is assumed lost with its worker and run
+# again; keep it above the longest job
+JOB_LEASE_SECONDS = 15 * 60
+# files written by export jobs
+JOB_EXPORT_DIR = os.environ.get('JOB_EXPORT_DIR', BASE_DIR / 'exports')
+# seconds export files are kept for download; run_worker --prune (or a
+# prune_exports job) deletes older ones
+JOB_EXPORT_RETENTION = 7 * 24 * 60 * 60
+JOB_EXPORT_PRUNE_INTERVAL = 60 * 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -1,9 +1,20 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Task
+from .models import Job, Task
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
-    list_display = ("title","priority", "status", "due_date", "user")
+    list_display = ("title","priority_level", "status", "due_date", "user")
     list_filter = ("status","priority", "due_date")
+
+    @admin.display(description="priority", ordering="priority_rank")
+    def priority_level(self, obj):
+        return obj.get_priority_display()
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "attempts", "user", "run_after", "finished_at")
+    list_filter = ("status", "name")
+    readonly_fields = ("locked_by", "locked_until", "started_at", "finished_at", "last_error")
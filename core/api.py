@@ -0,0 +1,181 @@
+"""
+JSON API for tasks. Listing reads values() dicts straight from the
+database, so no Task instances are built for a page of results.
+"""
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.forms.models import model_to_dict
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_http_methods
+
+from .forms import TaskForm
+from .models import TASK_SORT_KEYS, Task
+from .routers import replica_alias
+from .services.pagination import keyset_page, requested_page_size
+
+API_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "due_date",
+    "status",
+    "priority",
+    "created_at",
+    "updated_at",
+    "completed_at",
+)
+
+
+def api_login_required(view):
+    """login_required for the API: a 401 instead of a redirect to the login page."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({"error": "authentication required"}, status=401)
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+def _requested_fields(request):
+    """Fields from ``?fields=a,b``; all of API_FIELDS when absent."""
+    raw = request.GET.get("fields")
+    if not raw:
+        return API_FIELDS
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = sorted(set(fields) - set(API_FIELDS))
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    return fields or API_FIELDS
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        raise ValueError("invalid JSON body")
+    if not isinstance(data, dict):
+        raise ValueError("JSON body must be an object")
+    return data
+
+
+def serialize(task):
+    return {field: getattr(task, field) for field in API_FIELDS}
+
+
+def _save(form):
+    task = form.save(commit=False)
+    if task.status == "done" and not task.completed_at:
+        task.completed_at = timezone.now()
+    task.save()
+    return task
+
+
+def list_query(request):
+    """
+    The values() query and paging options for a task list request. Raises
+    ValueError for a bad ``?fields=``.
+    """
+    fields = _requested_fields(request)
+    keys = TASK_SORT_KEYS.get(request.GET.get("sort"), TASK_SORT_KEYS["due_date"])
+    # The sort keys must be selected to build cursors; they are dropped
+    # from the output again unless they were asked for.
+    extra = [key for key in keys if key not in fields]
+    return {
+        "queryset": (
+            Task.objects.using(replica_alias()).filter(user=request.user)
+            .values(*fields, *extra)
+        ),
+        "keys": keys,
+        "extra": extra,
+        "cursor": request.GET.get("cursor"),
+        "page_size": requested_page_size(
+            request, settings.API_PAGE_SIZE, settings.API_MAX_PAGE_SIZE
+        ),
+    }
+
+
+def list_response(page, extra):
+    rows = page["object_list"]
+    if extra:
+        for row in rows:
+            for key in extra:
+                del row[key]
+
+    return JsonResponse(
+        {
+            "results": rows,
+            "next": page["next_cursor"],
+            "prev": page["prev_cursor"],
+        }
+    )
+
+
+@api_login_required
+@require_http_methods(["GET", "POST"])
+def task_collection(request):
+    if request.method == "POST":
+        return _create(request)
+
+    try:
+        query = list_query(request)
+    except ValueError as exc:
+        return error(str(exc))
+    page = keyset_page(
+        query["queryset"],
+        query["keys"],
+        cursor=query["cursor"],
+        page_size=query["page_size"],
+    )
+    return list_response(page, query["extra"])
+
+
+def _create(request):
+    try:
+        data = _json_body(request)
+    except ValueError as exc:
+        return error(str(exc))
+    defaults = {
+        name: Task._meta.get_field(name).get_default()
+        for name in ("status", "priority")
+    }
+    form = TaskForm({**defaults, **data})
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    form.instance.user = request.user
+    return JsonResponse(serialize(_save(form)), status=201)
+
+
+@api_login_required
+@require_http_methods(["GET", "PUT", "PATCH", "DELETE"])
+def task_detail(request, pk):
+    task = Task.objects.filter(pk=pk, user=request.user).first()
+    if task is None:
+        return error("not found", status=404)
+
+    if request.method == "GET":
+        return JsonResponse(serialize(task))
+
+    if request.method == "DELETE":
+        task.delete()
+        return HttpResponse(status=204)
+
+    try:
+        data = _json_body(request)
+    except ValueError as exc:
+        return error(str(exc))
+    if request.method == "PATCH":
+        # Fields left out of a PATCH keep their current values.
+        data = {**model_to_dict(task, fields=TaskForm._meta.fields), **data}
+    form = TaskForm(data, instance=task)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    return JsonResponse(serialize(_save(form)))
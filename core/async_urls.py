@@ -0,0 +1,23 @@
+"""
+core.urls with the async views swapped in; served under ASGI through
+config.asgi_urls. Routes and names are identical, so reverse() and the
+templates work the same either way.
+"""
+from django.urls import path
+
+from . import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+ASYNC_VIEWS = {
+    "task_list": async_views.task_list,
+    "task_export": async_views.task_export,
+    "stats": async_views.stats_view,
+    "stats_productivity": async_views.productivity_data,
+    "api_task_list": async_views.api_task_collection,
+    "api_task_detail": async_views.api_task_detail,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS.get(pattern.name, pattern.callback), name=pattern.name)
+    for pattern in sync_urlpatterns
+]
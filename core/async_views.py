@@ -0,0 +1,149 @@
+"""
+Async versions of the read-only views, served under ASGI (see
+core.async_urls). They use the async ORM and cache API, so a request
+waiting on the database does not hold a worker thread. Parameters and
+responses are shared with the sync views, which stay in use under WSGI.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from . import api, views
+from .models import Task
+from .routers import replica_alias
+from .services.exports import EXPORT_CONTENT_TYPES, EXPORT_FORMATS, export_lines
+from .services.fragments import arender_task_rows
+from .services.pagination import akeyset_page
+from .services.search import aprepare_search
+from .services.stats import (
+    acached_task_completion_stats,
+    acached_weekly_productivity,
+)
+
+
+def _resolve_user(request, user):
+    # Templates, context processors and the shared helpers read
+    # request.user, which would otherwise load the user with a blocking
+    # query inside the event loop.
+    request.user = user
+
+
+def async_login_required(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        _resolve_user(request, user)
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def async_api_login_required(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({"error": "authentication required"}, status=401)
+        _resolve_user(request, user)
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+@async_login_required
+async def task_list(request):
+    today = timezone.localdate()
+    if request.GET.get("q", "").strip():
+        await aprepare_search()
+    params = views.task_list_params(request, today)
+    if params["search"] is not None:
+        page = views.search_page([row async for row in params["search"]], params)
+    else:
+        page = await akeyset_page(
+            params["tasks"],
+            params["keys"],
+            cursor=params["cursor"],
+            page_size=params["page_size"],
+        )
+    task_rows = await arender_task_rows(page["object_list"], today)
+    return render(
+        request, "core/task_list.html", views.task_list_context(params, page, task_rows)
+    )
+
+
+@async_login_required
+async def stats_view(request):
+    stats = await acached_task_completion_stats(request.user)
+    return render(request, "core/stats.html", views.stats_context(stats))
+
+
+@async_login_required
+@cache_control(private=True, no_cache=True)
+@condition(
+    etag_func=views.productivity_etag,
+    last_modified_func=views.productivity_last_modified,
+)
+async def productivity_data(request):
+    days = views.productivity_days(request)
+    if days is None:
+        return views.bad_productivity_days()
+
+    data = await acached_weekly_productivity(request.user, days=days, dense=True)
+    return JsonResponse(views.productivity_payload(days, data))
+
+
+@async_login_required
+async def task_export(request):
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("format must be csv or jsonl")
+    lines = export_lines(Task.objects.using(replica_alias()).filter(user=request.user), fmt)
+    response = StreamingHttpResponse(
+        _aiterate(lines), content_type=EXPORT_CONTENT_TYPES[fmt]
+    )
+    response["Content-Disposition"] = f'attachment; filename="tasks.{fmt}"'
+    return response
+
+
+async def _aiterate(iterator, _done=object()):
+    # export_lines reads with a server-side cursor; each chunk is pulled in
+    # a worker thread so the event loop never blocks on it.
+    pull = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await pull(iterator, _done)) is not _done:
+        yield chunk
+
+
+@async_api_login_required
+async def api_task_collection(request):
+    if request.method != "GET":
+        # writes go through the sync view and its form handling
+        return await sync_to_async(api.task_collection)(request)
+    try:
+        query = api.list_query(request)
+    except ValueError as exc:
+        return api.error(str(exc))
+    page = await akeyset_page(
+        query["queryset"],
+        query["keys"],
+        cursor=query["cursor"],
+        page_size=query["page_size"],
+    )
+    return api.list_response(page, query["extra"])
+
+
+@async_api_login_required
+async def api_task_detail(request, pk):
+    if request.method != "GET":
+        return await sync_to_async(api.task_detail)(request, pk=pk)
+    task = await Task.objects.filter(pk=pk, user=request.user).values(*api.API_FIELDS).afirst()
+    if task is None:
+        return api.error("not found", status=404)
+    return JsonResponse(task)
@@ -0,0 +1,96 @@
+"""
+The logged-in user, cached per session.
+
+CachedAuthenticationMiddleware (core.middleware) reads request.user from
+the SESSION_CACHE_ALIAS cache for AUTH_USER_CACHE_TIMEOUT seconds instead
+of querying auth_user on every request. Entries are stamped with a
+per-user generation, which core.signals replaces whenever the user row is
+saved (password change, deactivation, login), so those take effect on the
+next request. Logging out drops the session's entry.
+"""
+import time
+
+from django.conf import settings
+from django.contrib import auth
+from django.core.cache import caches
+
+
+def _cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+def _user_key(session_key):
+    return f"auth:user:{session_key}"
+
+
+def _generation_key(user_id):
+    return f"auth:generation:{user_id}"
+
+
+def _lookup_keys(session, user_id):
+    """(entry key, generation key), or None when there is nothing to cache."""
+    if not settings.AUTH_USER_CACHE_TIMEOUT or user_id is None or session.session_key is None:
+        return None
+    return _user_key(session.session_key), _generation_key(user_id)
+
+
+def _cached_user(keys, found):
+    entry, generation = found.get(keys[0]), found.get(keys[1])
+    if entry is not None and generation is not None and entry[0] == generation:
+        return entry[1]
+    return None
+
+
+def get_user(request):
+    """auth.get_user(), from the cache when the entry is still current."""
+    keys = _lookup_keys(request.session, request.session.get(auth.SESSION_KEY))
+    if keys is None:
+        return auth.get_user(request)
+    cache = _cache()
+    found = cache.get_many(keys)
+    user = _cached_user(keys, found)
+    if user is not None:
+        return user
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        generation = found.get(keys[1])
+        if generation is None:
+            generation = time.time_ns()
+            if not cache.add(keys[1], generation, timeout=None):
+                generation = cache.get(keys[1], generation)
+        cache.set(keys[0], (generation, user), settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+async def aget_user(request):
+    """See get_user()."""
+    user_id = await request.session.aget(auth.SESSION_KEY)
+    keys = _lookup_keys(request.session, user_id)
+    if keys is None:
+        return await auth.aget_user(request)
+    cache = _cache()
+    found = await cache.aget_many(keys)
+    user = _cached_user(keys, found)
+    if user is not None:
+        return user
+
+    user = await auth.aget_user(request)
+    if user.is_authenticated:
+        generation = found.get(keys[1])
+        if generation is None:
+            generation = time.time_ns()
+            if not await cache.aadd(keys[1], generation, timeout=None):
+                generation = await cache.aget(keys[1], generation)
+        await cache.aset(keys[0], (generation, user), settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_user(user_id):
+    """Make every cached copy of the user stale."""
+    _cache().set(_generation_key(user_id), time.time_ns(), timeout=None)
+
+
+def forget_session(session_key):
+    if session_key:
+        _cache().delete(_user_key(session_key))
@@ -0,0 +1,101 @@
+"""
+SQLite connection profile: settings.SQLITE_PRAGMAS is applied to every new
+SQLite connection from the connection_created signal. See the sqlite_pragmas
+command for what is actually in effect, and optimize_db for maintenance.
+copy_database is what sync_replica keeps local replicas current with.
+"""
+import re
+import sqlite3
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# PRAGMA reads return these as numbers
+PRAGMA_VALUES = {
+    "synchronous": {"off": 0, "normal": 1, "full": 2, "extra": 3},
+    "temp_store": {"default": 0, "file": 1, "memory": 2},
+}
+
+_PRAGMA_NAME = re.compile(r"^[a-z_]+$")
+_PRAGMA_VALUE = re.compile(r"^-?\w+$")
+
+
+def pragma_statements(pragmas):
+    """``PRAGMA name = value`` for each entry, in order."""
+    statements = []
+    for name, value in pragmas.items():
+        if not _PRAGMA_NAME.match(name) or not _PRAGMA_VALUE.match(str(value)):
+            raise ImproperlyConfigured(f"Invalid SQLITE_PRAGMAS entry {name!r}: {value!r}")
+        statements.append(f"PRAGMA {name} = {value}")
+    return statements
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """Apply ``pragmas`` to a sqlite3 connection."""
+    for statement in pragma_statements(pragmas):
+        dbapi_connection.execute(statement).fetchall()
+
+
+def normalize_pragma(name, value):
+    """``value`` as SQLite reports it back, so configured and read values compare."""
+    if isinstance(value, str):
+        value = value.lower()
+        value = PRAGMA_VALUES.get(name, {}).get(value, value)
+        if isinstance(value, str) and re.match(r"^-?\d+$", value):
+            value = int(value)
+    return value
+
+
+def pragmas_in_effect(dbapi_connection, names):
+    """{name: value} as reported by SQLite; None for pragmas it does not report."""
+    values = {}
+    for name in names:
+        if _PRAGMA_NAME.match(name):
+            row = dbapi_connection.execute(f"PRAGMA {name}").fetchone()
+            values[name] = row[0] if row else None
+    return values
+
+
+def pragma_report(connection, pragmas=None):
+    """
+    [(name, configured, in effect, matches)] for ``connection``'s SQLite
+    database. In-memory databases report journal_mode "memory" and no
+    mmap_size, so those do not match there.
+    """
+    pragmas = settings.SQLITE_PRAGMAS if pragmas is None else pragmas
+    connection.ensure_connection()
+    actual = pragmas_in_effect(connection.connection, pragmas)
+    return [
+        (
+            name,
+            configured,
+            actual.get(name),
+            normalize_pragma(name, configured) == normalize_pragma(name, actual.get(name)),
+        )
+        for name, configured in pragmas.items()
+    ]
+
+
+def copy_database(connection, path):
+    """
+    Copy ``connection``'s SQLite database (even an in-memory one) into the
+    file ``path`` with SQLite's online backup. Connections reading ``path``
+    meanwhile see the old or the new copy, never a mix.
+    """
+    connection.ensure_connection()
+    target = sqlite3.connect(path)
+    try:
+        connection.connection.backup(target)
+    finally:
+        target.close()
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    # On the raw connection, so the statements are not counted as queries
+    # of whichever request happened to open it.
+    apply_pragmas(connection.connection, settings.SQLITE_PRAGMAS)
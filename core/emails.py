@@ -1,30 +1,220 @@
-from django.core.mail import send_mail
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, time as dt_time
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
 from django.utils import timezone
-from .models import Task
+from . import metrics
+from .models import ReminderRun, Task
+
+REMINDER_SUBJECT = "You have overdue tasks"
 
-def send_overdue_task_reminders():
-    today = timezone.now().date()
 
-    overdue_tasks = Task.objects.filter(
+def reminder_candidates(today, cutoff, since=None):
+    """
+    Open overdue tasks that need a reminder: never reminded, or last
+    reminded before ``cutoff``. ``since`` is the previous run's watermark;
+    anything reminded before it was already picked up by that run, so the
+    repeat scan only covers [since, cutoff).
+    """
+    repeat = Q(last_reminded_at__lt=cutoff)
+    if since is not None:
+        repeat &= Q(last_reminded_at__gte=since)
+    return Task.objects.filter(
+        Q(last_reminded_at__isnull=True) | repeat,
         due_date__lt=today,
         status__in=["todo", "doing"],
-    ).select_related("user")
+    )
+
+
+def repeat_cutoff(today):
+    """Tasks last reminded before this are due for another reminder."""
+    first_day = today - timezone.timedelta(days=settings.REMINDER_REPEAT_DAYS - 1)
+    return timezone.make_aware(datetime.combine(first_day, dt_time.min))
+
+
+def overdue_reminders(tasks, chunk_size=2000):
+    """
+    Yield (task ids, EmailMessage) for each user with tasks in ``tasks``.
+    Tasks are streamed from the database in user order, so only one user's
+    tasks are held in memory at a time.
+    """
+    rows = (
+        tasks.order_by("user_id", "due_date", "id")
+        .values_list("user_id", "user__email", "id", "title", "due_date")
+        .iterator(chunk_size=chunk_size)
+    )
+
+    for (user_id, email), user_rows in groupby(rows, key=lambda row: row[:2]):
+        task_ids = []
+        lines = ["These tasks are overdue:\n\n"]
+        for _, _, task_id, title, due_date in user_rows:
+            task_ids.append(task_id)
+            lines.append(f"- {title} (due {due_date})\n")
+        yield task_ids, EmailMessage(REMINDER_SUBJECT, "".join(lines), None, [email])
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class RateLimiter:
+    """Spaces sends out to at most ``rate`` messages per second, across threads."""
 
-    users = {}
+    def __init__(self, rate=None):
+        self.interval = 1 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
 
-    for task in overdue_tasks:
-        users.setdefault(task.user, []).append(task)
+    def acquire(self, count=1):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next, now)
+            self._next = start + count * self.interval
+        if start > now:
+            time.sleep(start - now)
 
-    for user, tasks in users.items():
-        subject = "You have overdue tasks"
-        message = "These tasks are overdue:\n\n"
 
-        for task in tasks:
-            message += f"- {task.title} (due {task.due_date})\n"
+def send_overdue_task_reminders(
+    batch_size=100,
+    chunk_size=2000,
+    workers=1,
+    rate=None,
+    dry_run=False,
+    connection=None,
+):
+    """
+    Send overdue reminders in batches. With one worker every batch goes over
+    ``connection`` (or a single new one); with more, batches are spread over
+    a thread pool where each worker keeps its own connection open. Returns a
+    summary with the number sent and the per-batch send latencies.
 
-        send_mail(
-            subject,
-            message,
-            None,
-            [user.email],
+    Each batch's tasks are claimed (last_reminded_at set) before it is sent,
+    so an overlapping run or a rerun after a crash cannot send them again.
+    Claims of a batch that fails to send are released.
+    """
+    if workers > 1:
+        # connections are not thread-safe; every worker opens its own
+        connection = None
+
+    now = timezone.now()
+    today = timezone.localdate(now)
+    cutoff = repeat_cutoff(today)
+    since = (
+        ReminderRun.objects.filter(finished_at__isnull=False)
+        .order_by("-finished_at")
+        .values_list("watermark", flat=True)
+        .first()
+    )
+    candidates = reminder_candidates(today, cutoff, since)
+    run = None if dry_run else ReminderRun.objects.create(started_at=now, watermark=cutoff)
+
+    limiter = RateLimiter(rate)
+    local = threading.local()
+    opened = []
+    claimed_total = 0
+
+    def claim(batch):
+        nonlocal claimed_total
+        messages = [message for _, message in batch]
+        if dry_run:
+            return [], messages
+        task_ids = [task_id for ids, _ in batch for task_id in ids]
+        claimed = candidates.filter(pk__in=task_ids).update(last_reminded_at=now)
+        if claimed != len(task_ids):
+            # Some tasks were claimed elsewhere or closed in the meantime.
+            kept = set(
+                Task.objects.filter(pk__in=task_ids, last_reminded_at=now)
+                .values_list("pk", flat=True)
+            )
+            messages = [message for ids, message in batch if kept.intersection(ids)]
+            task_ids = list(kept)
+        claimed_total += claimed
+        return task_ids, messages
+
+    def release(task_ids):
+        Task.objects.filter(pk__in=task_ids, last_reminded_at=now).update(
+            last_reminded_at=None
         )
+
+    def send(messages):
+        limiter.acquire(len(messages))
+        started = time.perf_counter()
+        if dry_run:
+            sent = len(messages)
+        else:
+            worker_connection = getattr(local, "connection", None)
+            if worker_connection is None:
+                worker_connection = local.connection = connection or get_connection()
+                worker_connection.open()
+                opened.append(worker_connection)
+            sent = worker_connection.send_messages(messages) or 0
+        return sent, time.perf_counter() - started
+
+    batches = (
+        claim(batch)
+        for batch in batched(overdue_reminders(candidates, chunk_size), batch_size)
+    )
+    results = []
+    started = time.perf_counter()
+    try:
+        if workers <= 1:
+            for task_ids, messages in batches:
+                try:
+                    results.append(send(messages))
+                except Exception:
+                    release(task_ids)
+                    metrics.REMINDER_FAILURES.inc()
+                    raise
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # Keep a bounded number of batches in flight so memory stays
+                # flat however many reminders there are.
+                pending = {}
+
+                def collect(futures):
+                    for future in futures:
+                        task_ids = pending.pop(future)
+                        try:
+                            results.append(future.result())
+                        except Exception:
+                            release(task_ids)
+                            metrics.REMINDER_FAILURES.inc()
+                            raise
+
+                for task_ids, messages in batches:
+                    if len(pending) >= workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending[pool.submit(send, messages)] = task_ids
+                collect(list(pending))
+    finally:
+        for worker_connection in opened:
+            worker_connection.close()
+
+    sent = sum(sent for sent, _ in results)
+    if not dry_run:
+        metrics.REMINDER_EMAILS.inc(sent)
+        metrics.REMINDER_TASKS.inc(claimed_total)
+    if run is not None:
+        run.finished_at = timezone.now()
+        run.tasks_reminded = claimed_total
+        run.emails_sent = sent
+        run.save(update_fields=["finished_at", "tasks_reminded", "emails_sent"])
+
+    return {
+        "sent": sent,
+        "tasks": claimed_total,
+        "batches": len(results),
+        "elapsed": time.perf_counter() - started,
+        "latencies": [latency for _, latency in results],
+        "dry_run": dry_run,
+    }
@@ -0,0 +1,241 @@
+"""
+Background jobs, stored in the Job table and run by ./manage.py run_worker.
+
+Handlers are registered by name with @handler and get the Job; whatever
+they return is stored as its result. A job that raises is retried after
+JOB_RETRY_BACKOFF seconds, doubling per attempt, until max_attempts; a job
+whose worker dies is run again once its lease (JOB_LEASE_SECONDS) runs
+out, also until max_attempts. Jobs can therefore run more than once, so
+handlers must be safe to repeat.
+"""
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core import metrics
+from core.emails import send_overdue_task_reminders
+from core.models import Job, Task
+from core.services.exports import export_lines
+from core.services.rollups import reconcile_users
+
+_handlers = {}
+
+
+def handler(name):
+    """Register the decorated function as the handler for jobs called ``name``."""
+
+    def register(func):
+        _handlers[name] = func
+        return func
+
+    return register
+
+
+def enqueue(name, payload=None, user=None, run_after=None, max_attempts=None):
+    """
+    Queue a job. Inside a transaction it becomes visible to workers when
+    the transaction commits, together with the data it is about.
+    """
+    if name not in _handlers:
+        raise ValueError(f"unknown job {name!r}")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        user=user,
+        run_after=run_after or timezone.now(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _claimable(now):
+    return Q(status="queued", run_after__lte=now) | Q(
+        status="running", locked_until__lt=now, attempts__lt=F("max_attempts")
+    )
+
+
+def _fail_expired(now):
+    """
+    Mark jobs that lost their lease on their last attempt as failed; they
+    would otherwise stay "running" for good. Returns how many.
+    """
+    expired = Job.objects.filter(
+        status="running", locked_until__lt=now, attempts__gte=F("max_attempts")
+    )
+    failed = 0
+    for job_id, name in expired.values_list("id", "name"):
+        # the filter again, in case a worker finished it meanwhile
+        if expired.filter(pk=job_id).update(
+            status="failed",
+            finished_at=now,
+            locked_by="",
+            locked_until=None,
+            last_error=(
+                "Lease ran out on the last attempt: the worker died or the job ran "
+                "longer than JOB_LEASE_SECONDS"
+            ),
+        ):
+            metrics.JOBS.inc(name=name, outcome="failed")
+            failed += 1
+    return failed
+
+
+def claim(worker=None, names=None):
+    """
+    Take the next due job for ``worker``, or return None when there is
+    none. The UPDATE rechecks the job is still claimable, so two workers
+    racing for it cannot both get it.
+    """
+    worker = worker or worker_name()
+    _fail_expired(timezone.now())
+    while True:
+        now = timezone.now()
+        due = Job.objects.filter(_claimable(now))
+        if names:
+            due = due.filter(name__in=names)
+        job_id = due.order_by("run_after", "id").values_list("id", flat=True).first()
+        if job_id is None:
+            return None
+        token = f"{worker}/{uuid.uuid4().hex[:12]}"
+        claimed = Job.objects.filter(_claimable(now), pk=job_id).update(
+            status="running",
+            attempts=F("attempts") + 1,
+            started_at=now,
+            locked_by=token,
+            locked_until=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+        # another worker got there first; try the next one
+
+
+def retry_delay(attempts):
+    """Seconds before retry number ``attempts``, with up to 10% jitter."""
+    delay = min(
+        settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX
+    )
+    return delay * random.uniform(1.0, 1.1)
+
+
+def run(job):
+    """
+    Run a claimed job and record the outcome: "done", "queued" again for
+    a retry, or "failed". Returns the outcome.
+    """
+    lag = (job.started_at - job.run_after).total_seconds()
+    metrics.JOB_LAG.observe(max(lag, 0.0), name=job.name)
+    started = time.perf_counter()
+    func = _handlers.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f"no handler for job {job.name!r}")
+        result = func(job)
+    except Exception:
+        error = traceback.format_exc()
+        if func is not None and job.attempts < job.max_attempts:
+            outcome = "retry"
+            update = {
+                "status": "queued",
+                "run_after": timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+            }
+        else:
+            outcome = "failed"
+            update = {"status": "failed", "finished_at": timezone.now()}
+        update["last_error"] = error[-5000:]
+    else:
+        outcome = "done"
+        update = {"status": "done", "finished_at": timezone.now(), "result": result}
+    metrics.JOB_DURATION.observe(time.perf_counter() - started, name=job.name)
+    metrics.JOBS.inc(name=job.name, outcome=outcome)
+
+    # only while we still hold it; after the lease ran out another worker
+    # may have taken it over
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        locked_by="", locked_until=None, **update
+    )
+    metrics.maybe_flush()
+    return outcome
+
+
+# Jobs run by the app
+
+
+@handler("send_overdue_reminders")
+def send_overdue_reminders(job):
+    report = send_overdue_task_reminders(**job.payload)
+    return {"sent": report["sent"], "batches": report["batches"]}
+
+
+@handler("reconcile_completions")
+def reconcile_completions(job):
+    reconciled, totals = reconcile_users(**job.payload)
+    return {"users": reconciled, **totals}
+
+
+def export_path(job):
+    return Path(settings.JOB_EXPORT_DIR) / f"tasks-{job.pk}.{job.payload['format']}"
+
+
+@handler("export_tasks")
+def export_tasks(job):
+    path = export_path(job)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = export_lines(Task.objects.filter(user_id=job.user_id), job.payload["format"])
+    # write-then-rename, so a download never gets a half-written file
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".export-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            for line in lines:
+                f.write(line)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return {"path": str(path), "bytes": path.stat().st_size}
+
+
+def prune_exports(now=None):
+    """
+    Delete export files older than JOB_EXPORT_RETENTION seconds, and temp
+    files older than JOB_LEASE_SECONDS (left by a worker that died while
+    writing). Returns the number of files deleted.
+    """
+    directory = Path(settings.JOB_EXPORT_DIR)
+    if not directory.is_dir():
+        return 0
+    now = now or time.time()
+    max_age = {
+        "tasks-": settings.JOB_EXPORT_RETENTION,
+        ".export-": settings.JOB_LEASE_SECONDS,
+    }
+    deleted = 0
+    for entry in os.scandir(directory):
+        prefix = next((p for p in max_age if entry.name.startswith(p)), None)
+        if prefix is None or not entry.is_file():
+            continue
+        try:
+            if now - entry.stat().st_mtime > max_age[prefix]:
+                os.unlink(entry.path)
+                deleted += 1
+        except FileNotFoundError:
+            continue  # removed meanwhile
+    return deleted
+
+
+@handler("prune_exports")
+def prune_exports_job(job):
+    return {"deleted": prune_exports()}
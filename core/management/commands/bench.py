@@ -0,0 +1,142 @@
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.emails import send_overdue_task_reminders
+from core.models import Task
+from core.services.bench import bench_user, measure, write_report
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure view and reminder latency (p50/p95/p99), SQL queries and peak "
+        "memory against the current data; see seed_data"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            dest="username",
+            help="User the views are requested as (default: the user with most tasks)",
+        )
+        parser.add_argument(
+            "--iterations", type=int, default=50, help="Timed runs per scenario (default: 50)"
+        )
+        parser.add_argument(
+            "--warmup", type=int, default=5, help="Untimed runs first (default: 5)"
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            default=[],
+            help="Only run this scenario (repeatable)",
+        )
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="Write the JSON report here, or - for stdout (default: -)",
+        )
+
+    def scenarios(self, client):
+        """name -> (callable, rollback)"""
+
+        def get(url, **params):
+            def run():
+                response = client.get(url, params)
+                if response.status_code != 200:
+                    raise CommandError(f"GET {url} returned {response.status_code}")
+            return run
+
+        def create():
+            response = client.post(reverse("task_create"), {
+                "title": "Benchmark task",
+                "status": "todo",
+                "priority": "medium",
+                "due_date": timezone.localdate().isoformat(),
+            })
+            if response.status_code != 302:
+                raise CommandError(f"task_create returned {response.status_code}")
+
+        def reminders():
+            mail.outbox = []
+            send_overdue_task_reminders(connection=EmailBackend())
+
+        task_list = reverse("task_list")
+        return {
+            "task_list": (get(task_list, filter="all"), False),
+            "task_list_priority": (get(task_list, filter="all", sort="priority"), False),
+            "task_list_week": (get(task_list), False),
+            "stats_view": (get(reverse("stats")), False),
+            "productivity_data": (get(reverse("stats_productivity"), days=30), False),
+            "task_create": (create, True),
+            "send_overdue_emails": (reminders, True),
+        }
+
+    def handle(self, *args, username, iterations, warmup, scenarios, output, **options):
+        if iterations < 1 or warmup < 0:
+            raise CommandError("--iterations must be at least 1 and --warmup at least 0")
+
+        User = get_user_model()
+        user = bench_user(username)
+        if user is None:
+            raise CommandError("No user to benchmark as; run seed_data or pass --user")
+
+        report = {
+            "revision": _git_revision(),
+            "created": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": settings.DATABASES["default"]["ENGINE"],
+            "dataset": {
+                "users": User.objects.count(),
+                "tasks": Task.objects.count(),
+                "user": user.username,
+                "user_tasks": Task.objects.filter(user=user).count(),
+            },
+            "results": {},
+        }
+
+        # the test Client's host has to be allowed whatever the settings say
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            client = Client()
+            client.force_login(user)
+            available = self.scenarios(client)
+            unknown = set(scenarios) - set(available)
+            if unknown:
+                raise CommandError(
+                    f"Unknown scenario(s) {', '.join(sorted(unknown))}; "
+                    f"choose from {', '.join(available)}"
+                )
+            for name, (run, rollback) in available.items():
+                if scenarios and name not in scenarios:
+                    continue
+                result = measure(run, iterations=iterations, warmup=warmup, rollback=rollback)
+                report["results"][name] = result
+                self.stderr.write(
+                    f"{name:<22} p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  "
+                    f"p99 {result['p99_ms']:8.2f}ms  {result['queries']:3d} queries  "
+                    f"{result['peak_kb']:9.1f} KiB peak"
+                )
+
+        write_report(self, report, output)
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext, async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.models import Task
+from core.services.bench import bench_user, write_report
+
+MODES = ("wsgi", "asgi")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput of concurrent requests to the read-only views "
+        "served sync (WSGI, a thread per request) and async (ASGI)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            dest="username",
+            help="User the views are requested as (default: the user with most tasks)",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Requests per route and mode (default: 200)"
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=16, help="Requests in flight (default: 16)"
+        )
+        parser.add_argument(
+            "--mode", action="append", dest="modes", choices=MODES, default=[],
+            help="Only run this mode (repeatable)",
+        )
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="Write the JSON report here, or - for stdout (default: -)",
+        )
+
+    def routes(self):
+        task_list = reverse("task_list")
+        return {
+            "task_list": (task_list, {"filter": "all"}),
+            "stats_view": (reverse("stats"), {}),
+            "productivity_data": (reverse("stats_productivity"), {"days": 30}),
+            "api_task_list": (reverse("api_task_list"), {}),
+        }
+
+    def run_wsgi(self, cookies, url, params, total, concurrency):
+        local = threading.local()
+
+        def request(_):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = Client()
+                client.cookies.update(cookies)
+            return client.get(url, params).status_code
+
+        def close_connections(_):
+            connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            started = time.perf_counter()
+            statuses = list(pool.map(request, range(total)))
+            elapsed = time.perf_counter() - started
+            # each worker thread opened its own database connections
+            list(pool.map(close_connections, range(concurrency)))
+        return statuses, elapsed
+
+    def run_asgi(self, cookies, url, params, total, concurrency):
+        async def run():
+            client = AsyncClient()
+            client.cookies.update(cookies)
+            slots = asyncio.Semaphore(concurrency)
+
+            async def request():
+                async with slots:
+                    # what ASGIHandler does per request: sync code it calls
+                    # gets its own thread instead of queuing behind the others
+                    async with ThreadSensitiveContext():
+                        response = await client.get(url, params)
+                return response.status_code
+
+            started = time.perf_counter()
+            statuses = await asyncio.gather(*(request() for _ in range(total)))
+            return statuses, time.perf_counter() - started
+
+        with override_settings(ROOT_URLCONF="config.asgi_urls"):
+            return async_to_sync(run)()
+
+    def handle(self, *args, username, requests, concurrency, modes, output, **options):
+        if requests < 1 or concurrency < 1:
+            raise CommandError("--requests and --concurrency must be at least 1")
+
+        user = bench_user(username)
+        if user is None:
+            raise CommandError("No user to benchmark as; run seed_data or pass --user")
+
+        report = {
+            "database": settings.DATABASES["default"]["ENGINE"],
+            "user": user.username,
+            "user_tasks": Task.objects.filter(user=user).count(),
+            "requests": requests,
+            "concurrency": concurrency,
+            "results": {},
+        }
+        runners = {"wsgi": self.run_wsgi, "asgi": self.run_asgi}
+
+        # the test clients' host has to be allowed whatever the settings say
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            login = Client()
+            login.force_login(user)
+            for name, (url, params) in self.routes().items():
+                result = report["results"][name] = {}
+                for mode in modes or MODES:
+                    statuses, elapsed = runners[mode](
+                        login.cookies, url, params, requests, concurrency
+                    )
+                    failed = sum(status != 200 for status in statuses)
+                    if failed:
+                        raise CommandError(f"{mode} {name}: {failed} of {requests} requests failed")
+                    result[mode] = {
+                        "seconds": round(elapsed, 3),
+                        "requests_per_second": round(requests / elapsed, 1),
+                    }
+                    self.stderr.write(
+                        f"{name:<18} {mode}  {requests / elapsed:8.1f} req/s  ({elapsed:.2f}s)"
+                    )
+
+        write_report(self, report, output)
@@ -0,0 +1,82 @@
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.db import copy_database
+from core.services.bench import mixed_workload, write_report
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare mixed read/write throughput on copies of the SQLite database "
+        "with SQLite's defaults and with SQLITE_PRAGMAS"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=8, help="Concurrent connections (default: 8)"
+        )
+        parser.add_argument(
+            "--seconds", type=float, default=5.0, help="Duration of each run (default: 5)"
+        )
+        parser.add_argument(
+            "--write-share",
+            type=float,
+            default=0.2,
+            help="Share of operations that are writes (default: 0.2)",
+        )
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="Write the JSON report here, or - for stdout (default: -)",
+        )
+
+    def handle(self, *args, threads, seconds, write_share, output, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("bench_db measures SQLite settings; the database is not SQLite")
+        if threads < 1 or seconds <= 0 or not 0 <= write_share <= 1:
+            raise CommandError(
+                "--threads must be at least 1, --seconds positive and --write-share in 0..1"
+            )
+
+        profiles = {
+            # what Python's sqlite3 module and Django give you out of the box
+            "default": {},
+            "profile": settings.SQLITE_PRAGMAS,
+        }
+        report = {
+            "threads": threads,
+            "seconds": seconds,
+            "write_share": write_share,
+            "pragmas": settings.SQLITE_PRAGMAS,
+            "results": {},
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, pragmas in profiles.items():
+                # a fresh copy each, so one run's journal and edits don't carry over
+                path = str(Path(tmp) / f"{name}.sqlite3")
+                copy_database(connection, path)
+                try:
+                    result = mixed_workload(
+                        path, pragmas, threads=threads, seconds=seconds, write_share=write_share
+                    )
+                except ValueError as exc:
+                    raise CommandError(str(exc))
+                report["results"][name] = result
+                self.stderr.write(
+                    f"{name:<8} {result['ops_per_second']:9.1f} ops/s  "
+                    f"({result['reads_per_second']:.1f} reads/s, "
+                    f"{result['writes_per_second']:.1f} writes/s)  "
+                    f"p99 {result['p99_ms']:8.2f}ms  {result['locked']} locked"
+                )
+
+        before = report["results"]["default"]["ops_per_second"]
+        after = report["results"]["profile"]["ops_per_second"]
+        report["speedup"] = round(after / before, 2) if before else None
+        if report["speedup"]:
+            self.stderr.write(f"profile is {report['speedup']}x the default throughput")
+
+        write_report(self, report, output)
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Task
+from core.services.exports import EXPORT_FIELDS, EXPORT_FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = "Export every user's tasks as CSV or JSONL, streamed from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=EXPORT_FORMATS,
+            default="csv",
+            help="Output format (default: csv)",
+        )
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="File to write, or - for stdout (default: -)",
+        )
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            default=[],
+            help="Only export this user's tasks (repeatable)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Rows fetched from the database at a time (default: 2000)",
+        )
+
+    def handle(self, *args, format, output, usernames, chunk_size, **options):
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        tasks = Task.objects.all()
+        if usernames:
+            tasks = tasks.filter(user__username__in=usernames)
+
+        # The user column holds the username, so the file can be fed back
+        # to import_tasks.
+        lines = export_lines(
+            tasks,
+            format,
+            fields=(*EXPORT_FIELDS, "user__username"),
+            columns=(*EXPORT_FIELDS, "user"),
+            chunk_size=chunk_size,
+        )
+        if output == "-":
+            for text in lines:
+                self.stdout.write(text, ending="")
+            return
+
+        with open(output, "w", newline="", encoding="utf-8") as f:
+            f.writelines(lines)
+        self.stderr.write(self.style.SUCCESS(f"Exported tasks to {output}"))
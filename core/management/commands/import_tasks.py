@@ -0,0 +1,75 @@
+import json
+import sys
+from contextlib import nullcontext
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.services.imports import IMPORT_FORMATS, TaskImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import tasks from a CSV or JSONL file, streamed in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for stdin")
+        parser.add_argument(
+            "--format",
+            choices=IMPORT_FORMATS,
+            help="Input format (default: from the file extension)",
+        )
+        parser.add_argument(
+            "--user",
+            dest="username",
+            help="Owner of rows without a user column",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows inserted per transaction (default: 1000)",
+        )
+        parser.add_argument(
+            "--errors",
+            dest="errors_path",
+            help="Write rejected rows here as JSONL (default: <path>.errors.jsonl)",
+        )
+
+    def handle(self, *args, path, format, username, batch_size, errors_path, **options):
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        fmt = format or Path(path).suffix.lstrip(".").lower()
+        if fmt not in IMPORT_FORMATS:
+            raise CommandError("Cannot tell the format from the file name; pass --format")
+
+        user = None
+        if username:
+            user = get_user_model().objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f"Unknown user {username!r}")
+
+        if errors_path is None:
+            errors_path = "import-errors.jsonl" if path == "-" else f"{path}.errors.jsonl"
+
+        source = nullcontext(sys.stdin) if path == "-" else open(path, newline="", encoding="utf-8")
+        with source as stream, open(errors_path, "w", encoding="utf-8") as errors_file:
+
+            def on_error(number, row, errors):
+                record = {"line": number, "row": row, "errors": errors}
+                errors_file.write(json.dumps(record, cls=DjangoJSONEncoder) + "\n")
+
+            importer = TaskImporter(default_user=user, batch_size=batch_size, on_error=on_error)
+            report = importer.run(read_rows(stream, fmt))
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {report['imported']} tasks"))
+        self.stdout.write(
+            f"{report['batches']} batches in {report['elapsed']:.2f}s "
+            f"({report['rate']:.0f} rows/s)"
+        )
+        if report["rejected"]:
+            self.stdout.write(self.style.WARNING(
+                f"Rejected {report['rejected']} rows; see {errors_path}"
+            ))
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh SQLite's query planner statistics (PRAGMA optimize); run it "
+        "from cron, e.g. hourly"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to optimize (default: default)",
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Run a full ANALYZE first (slower; after imports or large changes)",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            action="store_true",
+            help="Also copy the WAL back into the database file and truncate it",
+        )
+
+    def handle(self, *args, database, analyze, checkpoint, **options):
+        connection = connections[database]
+        if connection.vendor != "sqlite":
+            raise CommandError(f"Database {database!r} is not SQLite")
+
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            if analyze:
+                cursor.execute("ANALYZE")
+            # 0x10002: consider every table, not only ones this connection used
+            cursor.execute("PRAGMA optimize = 0x10002")
+            if checkpoint:
+                cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                if cursor.fetchone()[0]:
+                    self.stderr.write(self.style.WARNING(
+                        "Checkpoint incomplete: other connections are reading or writing"
+                    ))
+        elapsed = time.perf_counter() - started
+
+        done = "ANALYZE and PRAGMA optimize" if analyze else "PRAGMA optimize"
+        self.stdout.write(self.style.SUCCESS(f"Ran {done} in {elapsed:.2f}s"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core.services.rollups import reconcile_users
+
+
+class Command(BaseCommand):
+    help = "Backfill and repair the DailyCompletion rollups from Task rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of users reconciled per transaction (default: 500)",
+        )
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            default=[],
+            help="Only reconcile this user (repeatable)",
+        )
+
+    def handle(self, *args, batch_size, usernames, **options):
+        reconciled, totals = reconcile_users(usernames, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {reconciled} users: {totals['created']} rollups created, "
+            f"{totals['updated']} updated, {totals['deleted']} deleted"
+        ))
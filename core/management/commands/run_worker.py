@@ -0,0 +1,131 @@
+import logging
+import signal
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+
+from core.jobs import claim, prune_exports, run
+from core.services.bench import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the Job table (see core.jobs)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Jobs run at once, each in its own thread (default: 1)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when no job is due (default: 1)",
+        )
+        parser.add_argument(
+            "--name",
+            action="append",
+            dest="names",
+            default=[],
+            help="Only run jobs with this name (repeatable)",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no job is due instead of waiting for more",
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help=(
+                "Also delete old export files, at start and every "
+                "JOB_EXPORT_PRUNE_INTERVAL seconds"
+            ),
+        )
+
+    def handle(self, *args, concurrency, poll_interval, names, burst, prune, **options):
+        if concurrency < 1 or poll_interval <= 0:
+            raise CommandError("--concurrency must be at least 1 and --poll-interval positive")
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        outcomes = Counter()
+        lags = []
+
+        def work():
+            try:
+                while not stop.is_set():
+                    close_old_connections()
+                    try:
+                        job = claim(names=names)
+                        if job is not None:
+                            outcome = run(job)
+                    except Exception:
+                        logger.exception("Worker failed to claim or record a job")
+                        stop.wait(poll_interval)
+                        continue
+                    if job is None:
+                        if burst:
+                            return
+                        stop.wait(poll_interval)
+                        continue
+                    with lock:
+                        outcomes[outcome] += 1
+                        lags.append((job.started_at - job.run_after).total_seconds())
+            finally:
+                connections.close_all()
+
+        def sweep():
+            while True:
+                try:
+                    deleted = prune_exports()
+                except Exception:
+                    logger.exception("Worker failed to prune export files")
+                else:
+                    if deleted:
+                        logger.info("Pruned %d export files", deleted)
+                if burst or stop.wait(settings.JOB_EXPORT_PRUNE_INTERVAL):
+                    return
+
+        def shutdown(signum, frame):
+            self.stderr.write("Stopping after the running jobs finish")
+            stop.set()
+
+        previous = {sig: signal.signal(sig, shutdown) for sig in (signal.SIGINT, signal.SIGTERM)}
+        self.stderr.write(f"Worker running {concurrency} jobs at a time")
+        started = time.perf_counter()
+        sweeper = threading.Thread(target=sweep, daemon=True) if prune else None
+        try:
+            if sweeper is not None:
+                sweeper.start()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                for future in [pool.submit(work) for _ in range(concurrency)]:
+                    future.result()
+        finally:
+            stop.set()
+            if sweeper is not None:
+                sweeper.join()
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        elapsed = time.perf_counter() - started
+
+        processed = sum(outcomes.values())
+        lags_ms = [lag * 1000 for lag in lags]
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {processed} jobs in {elapsed:.2f}s ({processed / elapsed:.1f} jobs/s): "
+            f"{outcomes['done']} done, {outcomes['retry']} to retry, {outcomes['failed']} failed"
+        ))
+        if lags_ms:
+            self.stdout.write(
+                f"queue lag p50 {percentile(lags_ms, 50):.1f}ms "
+                f"p95 {percentile(lags_ms, 95):.1f}ms max {max(lags_ms):.1f}ms"
+            )
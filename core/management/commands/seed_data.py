@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.bench import SEED_PASSWORD, seed_data
+
+
+class Command(BaseCommand):
+    help = "Create users with realistic task backlogs for benchmarking"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=10, help="Users to create (default: 10)"
+        )
+        parser.add_argument(
+            "--tasks", type=int, default=1000, help="Tasks per user (default: 1000)"
+        )
+        parser.add_argument(
+            "--prefix",
+            default="bench",
+            help="Username prefix; names continue after existing ones (default: bench)",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Random seed, for repeatable data (default: 0)"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Tasks inserted per transaction (default: 2000)",
+        )
+
+    def handle(self, *args, users, tasks, prefix, seed, batch_size, **options):
+        if users < 1 or tasks < 0 or batch_size < 1:
+            raise CommandError("--users and --batch-size must be at least 1, --tasks at least 0")
+
+        started = time.perf_counter()
+        created = seed_data(users, tasks, prefix=prefix, seed=seed, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        total = len(created) * tasks
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(created)} users ({created[0].username}..{created[-1].username}) "
+            f"with {total} tasks in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} tasks/s)"
+        ))
+        self.stdout.write(f"Password for all seeded users: {SEED_PASSWORD}")
@@ -1,9 +1,55 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from core.emails import send_overdue_task_reminders
+from core.services.bench import percentile
+
 
 class Command(BaseCommand):
     help = "Send email reminders for overdue tasks"
 
-    def handle(self, *args, **kwargs):
-        send_overdue_task_reminders()
-        self.stdout.write(self.style.SUCCESS("Overdue task emails sent"))
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Messages handed to the mail connection at once (default: 100)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Threads sending batches, each with its own connection (default: 1)",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=None,
+            help="Maximum messages per second across all workers (default: unlimited)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Build the reminders but do not send them",
+        )
+
+    def handle(self, *args, batch_size, workers, rate, dry_run, **kwargs):
+        if batch_size < 1 or workers < 1:
+            raise CommandError("--batch-size and --workers must be at least 1")
+        if rate is not None and rate <= 0:
+            raise CommandError("--rate must be positive")
+
+        report = send_overdue_task_reminders(
+            batch_size=batch_size, workers=workers, rate=rate, dry_run=dry_run
+        )
+
+        elapsed = report["elapsed"]
+        latencies = [latency * 1000 for latency in report["latencies"]]
+        throughput = report["sent"] / elapsed if elapsed else 0.0
+        verb = "would be sent" if dry_run else "sent"
+        self.stdout.write(self.style.SUCCESS(f"Overdue task emails {verb}: {report['sent']}"))
+        self.stdout.write(
+            f"{report['batches']} batches in {elapsed:.2f}s "
+            f"({throughput:.1f} msg/s, {workers} workers); "
+            f"batch latency p50 {percentile(latencies, 50):.1f}ms "
+            f"p95 {percentile(latencies, 95):.1f}ms "
+            f"max {max(latencies, default=0.0):.1f}ms"
+        )
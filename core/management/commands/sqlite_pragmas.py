@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.db import pragma_report, pragmas_in_effect
+
+# reported even when SQLITE_PRAGMAS leaves them alone
+REPORTED_PRAGMAS = (
+    "journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size",
+    "temp_store", "foreign_keys",
+)
+
+
+class Command(BaseCommand):
+    help = "Show the SQLite pragmas in effect on a new connection, against SQLITE_PRAGMAS"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to check (default: default)",
+        )
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Fail when a configured pragma is not in effect",
+        )
+
+    def handle(self, *args, database, strict, **options):
+        connection = connections[database]
+        if connection.vendor != "sqlite":
+            raise CommandError(f"Database {database!r} is not SQLite")
+
+        report = pragma_report(connection)
+        configured = {name for name, *_ in report}
+        others = pragmas_in_effect(
+            connection.connection, [name for name in REPORTED_PRAGMAS if name not in configured]
+        )
+        rows = [
+            (name, str(wanted), str(actual), "ok" if ok else "MISMATCH")
+            for name, wanted, actual, ok in report
+        ] + [(name, "-", str(actual), "") for name, actual in others.items()]
+
+        self.stdout.write(f"{connection.settings_dict['NAME']}")
+        width = max(len(row[0]) for row in rows)
+        self.stdout.write(f"{'pragma':<{width}}  {'configured':>12}  {'in effect':>12}")
+        for name, wanted, actual, status in rows:
+            line = f"{name:<{width}}  {wanted:>12}  {actual:>12}  {status}"
+            self.stdout.write(self.style.WARNING(line) if status == "MISMATCH" else line)
+
+        mismatched = [name for name, *_, ok in report if not ok]
+        if mismatched and strict:
+            raise CommandError(f"Not in effect: {', '.join(mismatched)}")
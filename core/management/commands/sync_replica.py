@@ -0,0 +1,55 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.db import copy_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the default SQLite database over its replicas (REPLICA_DATABASES), "
+        "once or every --every seconds"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            action="append",
+            dest="aliases",
+            default=[],
+            help="Only refresh this replica alias (repeatable)",
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            help="Keep copying, this many seconds apart; keep it below REPLICA_PIN_SECONDS",
+        )
+
+    def handle(self, *args, aliases, every, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        aliases = aliases or settings.REPLICA_DATABASES
+        for alias in aliases:
+            if alias not in settings.REPLICA_DATABASES:
+                raise CommandError(f"{alias!r} is not in REPLICA_DATABASES")
+            if primary.vendor != "sqlite" or connections[alias].vendor != "sqlite":
+                raise CommandError(
+                    "sync_replica copies SQLite files; use the database's own replication"
+                )
+        if every is not None and every <= 0:
+            raise CommandError("--every must be positive")
+
+        while True:
+            for alias in aliases:
+                started = time.perf_counter()
+                copy_database(primary, connections[alias].settings_dict["NAME"])
+                self.stdout.write(
+                    f"Copied {primary.settings_dict['NAME']} to {alias} "
+                    f"in {time.perf_counter() - started:.2f}s"
+                )
+            if every is None:
+                break
+            # don't hold the primary's connection open between copies
+            primary.close()
+            time.sleep(every)
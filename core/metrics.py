@@ -0,0 +1,370 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Recording takes a short lock around a dict update and nothing else.
+Rendering copies the values under the lock and formats them outside it.
+With settings.METRICS_DIR set, every process also writes its values to a
+file there (at most every METRICS_FLUSH_INTERVAL seconds, and at exit),
+and /metrics adds up all the files. Several workers and one-off commands
+such as send_overdue_emails then report as one. Files of processes that
+have exited are folded into one retired file, so recycled workers do not
+pile up files.
+"""
+import atexit
+import fcntl
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+
+# seconds; request latency and similar
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_registry = {}
+# one file per process lifetime, so a reused pid never overwrites another
+# process's totals
+_process_token = f"{os.getpid()}-{time.time_ns()}"
+_last_flush = 0.0
+
+_SNAPSHOT_NAME = re.compile(r"^metrics-(\d+)-\d+\.json$")
+RETIRED_FILE = "metrics-retired.json"
+# names of the files already added to the retired file, in case deleting
+# them failed; not a metric, so _merge skips it
+_FOLDED_KEY = "_folded"
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _registry[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """{label values: value}, copied; call with _lock held."""
+        return dict(self._values)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class CallbackCounter(Metric):
+    """A counter whose values are read from ``callback()`` when collected."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames, callback):
+        super().__init__(name, help, labelnames)
+        self.callback = callback
+
+    def samples(self):
+        return {tuple(map(str, key)): value for key, value in self.callback().items()}
+
+
+class CacheCounter:
+    """
+    Hits and misses of a cache, exported as the counter ``name`` with a
+    "result" label.
+    """
+
+    def __init__(self, name, help):
+        self.hits = 0
+        self.misses = 0
+        CallbackCounter(
+            name, help, ["result"], lambda: {("hit",): self.hits, ("miss",): self.misses}
+        )
+
+    def record(self, hits=0, misses=0):
+        self.hits += hits
+        self.misses += misses
+
+    def info(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class Histogram(Metric):
+    """Fixed buckets; each value is [per-bucket counts (last is +Inf), sum]."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        return {key: [list(counts), total] for key, (counts, total) in self._values.items()}
+
+
+def snapshot():
+    """This process's metrics as a JSON-serializable dict."""
+    with _lock:
+        plain = {
+            name: metric.samples()
+            for name, metric in _registry.items()
+            if not isinstance(metric, CallbackCounter)
+        }
+    # callbacks may take their own locks; run them outside ours
+    for name, metric in _registry.items():
+        if isinstance(metric, CallbackCounter):
+            plain[name] = metric.samples()
+    return {
+        name: [[list(key), value] for key, value in samples.items()]
+        for name, samples in plain.items()
+    }
+
+
+def _merge(into, snap):
+    for name, samples in snap.items():
+        metric = _registry.get(name)
+        if metric is None:
+            continue
+        target = into[name]
+        for key, value in samples:
+            key = tuple(key)
+            if metric.kind == "histogram":
+                current = target.get(key)
+                if current is None or len(current[0]) != len(value[0]):
+                    target[key] = [list(value[0]), value[1]]
+                else:
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+            else:
+                target[key] = target.get(key, 0) + value
+
+
+def _snapshot_path(directory, token=None):
+    return os.path.join(directory, f"metrics-{token or _process_token}.json")
+
+
+def _write(path, snap):
+    # write-then-rename, so readers never see a half-written file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".metrics-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(snap, f)
+    os.replace(tmp, path)
+
+
+def _read(path, into):
+    try:
+        with open(path) as f:
+            snap = json.load(f)
+    except (OSError, ValueError):
+        return None  # removed or being replaced; counted next time
+    _merge(into, snap)
+    return snap
+
+
+def flush():
+    """Write this process's snapshot to METRICS_DIR, if set."""
+    global _last_flush
+    directory = settings.METRICS_DIR
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    _write(_snapshot_path(directory), snapshot())
+    _last_flush = time.monotonic()
+
+
+def _process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # another user's process
+    return True
+
+
+def retire_exited(directory):
+    """
+    Add the files of processes that have exited to RETIRED_FILE and delete
+    them. Returns how many were folded in.
+    """
+    with open(os.path.join(directory, ".metrics.lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        exited = []
+        for entry in os.scandir(directory):
+            match = _SNAPSHOT_NAME.match(entry.name)
+            if match and entry.path != _snapshot_path(directory):
+                if not _process_exists(int(match[1])):
+                    exited.append(entry)
+        if not exited:
+            return 0
+
+        retired_path = os.path.join(directory, RETIRED_FILE)
+        retired = defaultdict(dict)
+        folded = set((_read(retired_path, retired) or {}).get(_FOLDED_KEY, ()))
+        names = []
+        for entry in exited:
+            if entry.name in folded or _read(entry.path, retired) is not None:
+                names.append(entry.name)
+        snap = {
+            name: [[list(key), value] for key, value in samples.items()]
+            for name, samples in retired.items()
+        }
+        snap[_FOLDED_KEY] = names
+        _write(retired_path, snap)
+        for name in names:
+            try:
+                os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+        return len(names)
+
+
+def maybe_flush():
+    if settings.METRICS_DIR and time.monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        if settings.configured:
+            flush()
+    except OSError:
+        pass
+
+
+def collect():
+    """All processes' metrics added up: {name: {label values: value}}."""
+    merged = defaultdict(dict)
+    directory = settings.METRICS_DIR
+    own = _snapshot_path(directory) if directory else None
+    if directory and os.path.isdir(directory):
+        retire_exited(directory)
+        for entry in os.scandir(directory):
+            if entry.name.startswith("metrics-") and entry.path != own:
+                _read(entry.path, merged)
+    # this process's live values instead of its last flush
+    _merge(merged, snapshot())
+    return merged
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(merged=None):
+    """Prometheus text exposition format."""
+    merged = collect() if merged is None else merged
+    lines = []
+    for name, metric in sorted(_registry.items()):
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(merged.get(name, {}).items()):
+            if metric.kind != "histogram":
+                lines.append(f"{name}{_labels(metric.labelnames, key)} {_number(value)}")
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip([*metric.buckets, "+Inf"], counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(float(bound))
+                labels = _labels(metric.labelnames, key, [("le", le)])
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            labels = _labels(metric.labelnames, key)
+            lines.append(f"{name}_sum{labels} {_number(float(total))}")
+            lines.append(f"{name}_count{labels} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+# Metrics recorded by the app
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route, method and status class.",
+    ["route", "method", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to produce the response, by route.",
+    ["route"],
+)
+REQUEST_QUERIES = Counter(
+    "http_request_queries_total",
+    "SQL queries run while handling requests, by route.",
+    ["route"],
+)
+REMINDER_EMAILS = Counter(
+    "reminder_emails_sent_total", "Overdue reminder emails sent."
+)
+REMINDER_TASKS = Counter(
+    "reminder_tasks_total", "Overdue tasks covered by sent reminders."
+)
+REMINDER_FAILURES = Counter(
+    "reminder_batch_failures_total", "Reminder batches that failed to send."
+)
+JOBS = Counter(
+    "jobs_processed_total",
+    "Background jobs run, by job name and outcome (done, retry, failed).",
+    ["name", "outcome"],
+)
+JOB_DURATION = Histogram(
+    "job_duration_seconds", "Time to run a background job, by job name.", ["name"]
+)
+JOB_LAG = Histogram(
+    "job_queue_lag_seconds",
+    "Time from a job being due to a worker starting it, by job name.",
+    ["name"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+)
+
+
+_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+def observe_request(route, method, status, seconds, queries=0):
+    # labels stay bounded whatever clients send
+    route = route or "unmatched"
+    method = method if method in _METHODS else "other"
+    REQUESTS.inc(route=route, method=method, status=f"{status // 100}xx")
+    REQUEST_DURATION.observe(seconds, route=route)
+    if queries:
+        REQUEST_QUERIES.inc(queries, route=route)
+    maybe_flush()
@@ -0,0 +1,172 @@
+import logging
+import time
+
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from . import auth, metrics, routers
+from .timing import start_timings, stop_timings
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+def request_budget(url_name, method="GET"):
+    """
+    The budget for a ``method`` request to ``url_name``: its REQUEST_BUDGETS
+    entry, or its REQUEST_WRITE_BUDGETS entry for methods that may write,
+    falling back to that setting's "*".
+    """
+    if method in SAFE_METHODS:
+        budgets = settings.REQUEST_BUDGETS
+    else:
+        budgets = settings.REQUEST_WRITE_BUDGETS
+    return budgets.get(url_name) or budgets.get("*", {})
+
+
+class ServerTimingMiddleware:
+    """
+    Count SQL queries and time the database, templates and the whole
+    request. Adds a Server-Timing header, records the request in
+    core.metrics and logs a warning for requests over their budget (see
+    request_budget). Streaming bodies are produced after the response
+    leaves, so their queries are not included. Works for sync and async
+    requests.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = start_timings()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings.total = time.perf_counter() - started
+            stop_timings(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token = start_timings()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings.total = time.perf_counter() - started
+            stop_timings(token)
+        return self._finish(request, response, timings)
+
+    def _finish(self, request, response, timings):
+        request.timings = timings
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = timings.header()
+
+        match = request.resolver_match
+        url_name = match.view_name if match else None
+        metrics.observe_request(
+            url_name, request.method, response.status_code, timings.total, timings.queries
+        )
+
+        budget = request_budget(url_name, request.method)
+        over = []
+        if timings.queries > budget.get("queries", float("inf")):
+            over.append(f"{timings.queries} queries > {budget['queries']}")
+        if timings.total * 1000 > budget.get("ms", float("inf")):
+            over.append(f"{timings.total * 1000:.0f}ms > {budget['ms']}ms")
+        if over:
+            logger.warning(
+                "%s %s (%s) over budget: %s",
+                request.method, request.path, url_name, ", ".join(over),
+                extra={"timings": timings},
+            )
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Read from the primary database while the client's pin cookie is valid
+    and for requests that may write, and set the cookie after a request
+    that wrote (see core.routers). Does nothing without READ_REPLICAS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.stop_request(token)
+        return self._finish(request, response, state)
+
+    async def __acall__(self, request):
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.stop_request(token)
+        return self._finish(request, response, state)
+
+    def _start(self, request):
+        try:
+            pinned = int(request.COOKIES.get(routers.PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        return routers.start_request(pinned=pinned or request.method not in SAFE_METHODS)
+
+    def _finish(self, request, response, state):
+        if settings.READ_REPLICAS and (state["wrote"] or request.method not in SAFE_METHODS):
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                routers.PIN_COOKIE,
+                str(int(time.time()) + seconds),
+                max_age=seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+def _get_user(request):
+    if not hasattr(request, "_cached_user"):
+        request._cached_user = auth.get_user(request)
+    return request._cached_user
+
+
+async def _auser(request):
+    if not hasattr(request, "_acached_user"):
+        request._acached_user = await auth.aget_user(request)
+    return request._acached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    Django's AuthenticationMiddleware, with request.user read through the
+    cache in core.auth.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: _get_user(request))
+        request.auser = partial(_auser, request)
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_completions(apps, schema_editor):
+    Task = apps.get_model('core', 'Task')
+    DailyCompletion = apps.get_model('core', 'DailyCompletion')
+    rows = (
+        Task.objects.filter(status='done', completed_at__isnull=False)
+        .annotate(day=TruncDate('completed_at'))
+        .values('user_id', 'day')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    DailyCompletion.objects.bulk_create(
+        (DailyCompletion(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_task_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_completions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='daily_completion_user_day_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_completions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:20
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_dailycompletion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('watermark', models.DateTimeField()),
+                ('tasks_reminded', models.PositiveIntegerField(default=0)),
+                ('emails_sent', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'get_latest_by': 'started_at',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_status_due_idx',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='last_reminded_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'last_reminded_at', 'due_date'], name='task_reminder_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminderrun',
+            index=models.Index(fields=['finished_at'], name='reminder_run_finished_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+
+def backfill_priority_rank(apps, schema_editor):
+    Task = apps.get_model('core', 'Task')
+    # one UPDATE; medium is the column default
+    Task.objects.exclude(priority='medium').update(
+        priority_rank=Case(
+            When(priority='high', then=Value(0)),
+            When(priority='low', then=Value(2)),
+            default=Value(1),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_reminder_watermark'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=1, editable=False),
+        ),
+        migrations.RunPython(backfill_priority_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'priority_rank', 'due_date'], name='task_user_priority_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations
+
+# FTS5 index over core_task(title, description), frozen as of this
+# migration. The live definition is core.services.search.SEARCH_SCHEMA;
+# change the index there and in a new migration, not here.
+SEARCH_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS core_task_fts USING fts5(
+        title, description, content='core_task', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_task_fts_insert AFTER INSERT ON core_task BEGIN
+        INSERT INTO core_task_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_task_fts_delete AFTER DELETE ON core_task BEGIN
+        INSERT INTO core_task_fts(core_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_task_fts_update
+    AFTER UPDATE OF title, description ON core_task BEGIN
+        INSERT INTO core_task_fts(core_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO core_task_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO core_task_fts(core_task_fts) VALUES ('rebuild')",
+]
+
+DROP_SEARCH_SCHEMA = [
+    "DROP TRIGGER IF EXISTS core_task_fts_insert",
+    "DROP TRIGGER IF EXISTS core_task_fts_delete",
+    "DROP TRIGGER IF EXISTS core_task_fts_update",
+    "DROP TABLE IF EXISTS core_task_fts",
+]
+
+
+def fts5_available(schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_search_index(apps, schema_editor):
+    # Other backends (or SQLite builds without FTS5) use the icontains
+    # fallback in core.services.search.
+    if fts5_available(schema_editor):
+        for statement in SEARCH_SCHEMA:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in DROP_SEARCH_SCHEMA:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_task_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,9 +1,135 @@
-from django.db import models
+from functools import reduce
+from operator import or_
+
+from django.db import models, transaction
+from django.dispatch import Signal
 from django.utils import timezone
 
 # Create your models here.
 from django.conf import settings
 
+# Sent after queryset-level writes that skip post_save/post_delete, with the
+# ids of the users whose tasks were touched, plus the updated field names
+# (update), the new objects (bulk_create) or the tracked state of the
+# removed rows (delete).
+tasks_bulk_changed = Signal()
+
+
+# Keyset orderings for task lists; the last key makes each one unique
+TASK_SORT_KEYS = {
+    "due_date": ("due_date", "id"),
+    # highest priority first, then soonest due; served by the
+    # (user, priority_rank, due_date) index
+    "priority": ("priority_rank", "due_date", "id"),
+}
+
+
+class TaskQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        if set(kwargs) <= {"last_reminded_at"}:
+            # reminder bookkeeping; nothing derived from it
+            return super().update(**kwargs)
+        # auto_now only applies to save()
+        kwargs.setdefault("updated_at", timezone.now())
+        changed = [
+            ~models.Q(**{field: kwargs[field]})
+            for field in ("status", "due_date")
+            if field in kwargs
+        ]
+        if changed:
+            # re-arm the reminder only on rows whose value actually changes
+            kwargs.setdefault(
+                "last_reminded_at",
+                models.Case(
+                    models.When(reduce(or_, changed), then=models.Value(None)),
+                    default=models.F("last_reminded_at"),
+                ),
+            )
+        if "priority" in kwargs and "priority_rank" not in kwargs:
+            # only plain values can be mapped here; SET expressions would
+            # see the old priority
+            kwargs["priority_rank"] = Task.PRIORITY_RANKS[kwargs["priority"]]
+        user_ids = set(
+            self.order_by().values_list("user_id", flat=True).distinct()
+        )
+        rows = super().update(**kwargs)
+        if rows:
+            tasks_bulk_changed.send(
+                sender=Task, user_ids=user_ids, fields=set(kwargs)
+            )
+        return rows
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.sync_priority_rank()
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            tasks_bulk_changed.send(
+                sender=Task, user_ids={obj.user_id for obj in objs}, objs=objs
+            )
+        return objs
+
+    bulk_create.alters_data = True
+
+    def delete(self):
+        if self.model._meta.related_objects or self.query.is_sliced:
+            # cascades and slicing need Django's collector
+            return super().delete()
+        # The post_delete receivers would make Django fetch and delete the
+        # rows one by one; read the little they need up front and remove
+        # everything in a single DELETE instead.
+        with transaction.atomic(using=self.db):
+            deleted = [
+                Task(user_id=user_id, status=status, completed_at=completed_at)
+                for user_id, status, completed_at in self.order_by().values_list(
+                    "user_id", "status", "completed_at"
+                )
+            ]
+            if not deleted:
+                return 0, {}
+            rows = self._raw_delete(self.db)
+            tasks_bulk_changed.send(
+                sender=Task,
+                user_ids={task.user_id for task in deleted},
+                deleted=deleted,
+            )
+        return rows, {self.model._meta.label: rows}
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    # Columns task_list renders, plus the keys it pages on
+    LIST_FIELDS = (
+        "id", "title", "status", "priority", "priority_rank", "due_date", "updated_at",
+    )
+
+    def for_list(self, today=None):
+        """
+        Lightweight rows for task lists: named tuples with the listed
+        columns and ``is_overdue``/``is_complete`` computed in SQL against a
+        single ``today``, instead of full model instances.
+        """
+        today = today or timezone.localdate()
+        return self.annotate(
+            is_overdue=models.Case(
+                models.When(
+                    models.Q(due_date__lt=today) & ~models.Q(status="done"),
+                    then=True,
+                ),
+                default=False,
+                output_field=models.BooleanField(),
+            ),
+            is_complete=models.Case(
+                models.When(status="done", then=True),
+                default=False,
+                output_field=models.BooleanField(),
+            ),
+        ).values_list(*self.LIST_FIELDS, "is_overdue", "is_complete", named=True)
+
+
 class Task(models.Model):
     STATUS_CHOICES = [
         ("todo", "To do"),
@@ -15,6 +141,9 @@ class Task(models.Model):
         ("medium", "Medium"),
         ("low", "Low"),
     ]
+    # Sort order of the priorities, stored in priority_rank so the database
+    # can order by an index instead of the (alphabetical) text
+    PRIORITY_RANKS = {"high": 0, "medium": 1, "low": 2}
 
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -34,11 +163,86 @@ class Task(models.Model):
         choices=PRIORITY_CHOICES,
         default="medium"
     )
+    priority_rank = models.PositiveSmallIntegerField(default=1, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Set when an overdue reminder covering this task is sent; cleared when
+    # the task is rescheduled or changes status.
+    last_reminded_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # task_list: filter/sort by due date
+            models.Index(fields=["user", "due_date"], name="task_user_due_idx"),
+            # task_list sorted by priority
+            models.Index(
+                fields=["user", "priority_rank", "due_date"],
+                name="task_user_priority_idx",
+            ),
+            # task_list status filter and weekly_productivity (done tasks
+            # by completion time) share this one
+            models.Index(
+                fields=["user", "status", "completed_at"],
+                name="task_user_status_done_idx",
+            ),
+            # send_overdue_task_reminders: open overdue tasks never reminded,
+            # or last reminded inside the repeat window
+            models.Index(
+                fields=["status", "last_reminded_at", "due_date"],
+                name="task_reminder_idx",
+            ),
+        ]
+
+    # Stored values that write-time bookkeeping (rollups, reminders)
+    # compares against on save.
+    TRACKED_FIELDS = ("status", "completed_at", "due_date")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(field in field_names for field in cls.TRACKED_FIELDS):
+            instance._saved_state = instance.tracked_state()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        if fields is None or set(self.TRACKED_FIELDS) & set(fields):
+            self._saved_state = self.tracked_state()
+
+    def save(self, *args, **kwargs):
+        self.sync_priority_rank()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = {*update_fields, "updated_at"}
+            if "priority" in update_fields:
+                update_fields.add("priority_rank")
+            if {"status", "due_date"} & update_fields:
+                # may be cleared in pre_save, see core.signals
+                update_fields.add("last_reminded_at")
+            kwargs["update_fields"] = update_fields
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
+
+    def sync_priority_rank(self):
+        self.priority_rank = self.PRIORITY_RANKS.get(self.priority, self.priority_rank)
+
+    def tracked_state(self):
+        return {field: getattr(self, field) for field in self.TRACKED_FIELDS}
+
+    def completion_day(self, state=None):
+        """The day this task counts towards in DailyCompletion, if any."""
+        state = state or self.tracked_state()
+        completed_at = state["completed_at"]
+        if state["status"] != "done" or completed_at is None:
+            return None
+        if timezone.is_naive(completed_at):
+            return completed_at.date()
+        return timezone.localdate(completed_at)
     
     def is_overdue(self):
         return (
@@ -49,3 +253,98 @@ class Task(models.Model):
     
     def is_complete(self):
         return(self.status == "done")
+
+
+class DailyCompletion(models.Model):
+    """Number of tasks a user completed on a day, maintained on task writes"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="daily_completions",
+        # the (user, day) unique index already serves lookups by user
+        db_index=False,
+    )
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "day"], name="daily_completion_user_day_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.day}: {self.count}"
+
+
+class ReminderRun(models.Model):
+    """
+    One run of send_overdue_task_reminders. ``watermark`` is the repeat
+    cutoff the run covered: tasks it reminded were last reminded before it
+    (or never), so the next run only looks at reminders sent since.
+    """
+
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    watermark = models.DateTimeField()
+    tasks_reminded = models.PositiveIntegerField(default=0)
+    emails_sent = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        get_latest_by = "started_at"
+        indexes = [
+            # the latest finished run holds the current watermark
+            models.Index(fields=["finished_at"], name="reminder_run_finished_idx"),
+        ]
+
+    def __str__(self):
+        return f"Reminder run {self.started_at:%Y-%m-%d %H:%M}"
+
+
+class Job(models.Model):
+    """
+    A unit of deferred work, run by ./manage.py run_worker (see core.jobs).
+    Workers claim a job with a conditional UPDATE, so each is run by one
+    worker at a time; one that is still "running" after ``locked_until``
+    (its worker died) is claimed again.
+    """
+
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="jobs",
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    # not claimed before this; moved forward by retries
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # claiming: the next due job in each state
+            models.Index(fields=["status", "run_after"], name="job_status_run_after_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,87 @@
+"""
+Read replica routing.
+
+Querysets built with ``.using(replica_alias())`` (the list and stats views
+and services) read from one of settings.READ_REPLICAS; every other read,
+and every write, goes to the primary. A request that writes is pinned to
+the primary, and core.middleware.ReplicaPinMiddleware keeps the client's
+next requests there for REPLICA_PIN_SECONDS, so nobody reads a replica
+that has not caught up with their own change yet.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = "pin_primary"
+
+# {"pinned": bool, "wrote": bool} for the request being handled; mutated
+# in place, so the async ORM's worker threads share it
+_request_state = ContextVar("replica_request_state", default=None)
+_primary_reads = ContextVar("primary_reads", default=False)
+
+
+def start_request(pinned=False):
+    state = {"pinned": pinned, "wrote": False}
+    return state, _request_state.set(state)
+
+
+def stop_request(token):
+    _request_state.reset(token)
+
+
+def pinned_to_primary():
+    state = _request_state.get()
+    return _primary_reads.get() or bool(state and (state["pinned"] or state["wrote"]))
+
+
+@contextmanager
+def primary_reads(changed_at=None):
+    """
+    Read from the primary inside the block. With ``changed_at`` (a
+    time.time_ns() timestamp of the last change to the data read), only
+    when that change may not have reached the replicas yet.
+    """
+    recent = changed_at is None or time.time_ns() - changed_at < (
+        settings.REPLICA_PIN_SECONDS * 1_000_000_000
+    )
+    token = _primary_reads.set(_primary_reads.get() or recent)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+def replica_alias():
+    """
+    The alias for a read that may lag behind the primary: a replica, or
+    the primary when there are none or the request is pinned to it.
+    """
+    replicas = settings.READ_REPLICAS
+    if not replicas or pinned_to_primary() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        # inside a transaction, read what it has written
+        return DEFAULT_DB_ALIAS
+    return random.choice(replicas)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # also for rows related to ones read from a replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # even for instances that were read from a replica
+        state = _request_state.get()
+        if state is not None:
+            state["wrote"] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # replicas hold the same rows as the primary
+
+    def allow_migrate(self, db, app_label, **hints):
+        # replicas are copies of the primary, schema included
+        return db not in settings.REPLICA_DATABASES
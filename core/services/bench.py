@@ -0,0 +1,258 @@
+import json
+import random
+import sqlite3
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core.db import apply_pragmas
+from core.models import Task
+
+SEED_PASSWORD = "bench-password"
+
+# Rough shape of a real backlog
+STATUS_WEIGHTS = {"todo": 45, "doing": 20, "done": 35}
+PRIORITY_WEIGHTS = {"high": 20, "medium": 50, "low": 30}
+NO_DUE_DATE_SHARE = 0.15
+DESCRIPTION_SHARE = 0.6
+
+_WORDS = (
+    "review report invoice deploy meeting budget release draft client design "
+    "update backlog migrate fix audit plan email call schedule test"
+).split()
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def bench_user(username=None):
+    """The user called ``username``, or the one with the most tasks; None if missing."""
+    User = get_user_model()
+    if username:
+        return User.objects.filter(username=username).first()
+    user_id = (
+        Task.objects.values("user_id").annotate(n=Count("id"))
+        .order_by("-n").values_list("user_id", flat=True).first()
+    )
+    return User.objects.filter(pk=user_id).first()
+
+
+def write_report(command, report, output):
+    """Write ``report`` as JSON to the file ``output``, or to stdout for "-"."""
+    text = json.dumps(report, indent=2)
+    if output == "-":
+        command.stdout.write(text)
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        command.stderr.write(command.style.SUCCESS(f"Wrote {output}"))
+
+
+def _choice(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def seed_tasks(user, count, rng, today=None, now=None):
+    """``count`` unsaved Tasks for ``user`` with a realistic mix of states."""
+    today = today or timezone.localdate()
+    now = now or timezone.now()
+    for _ in range(count):
+        status = _choice(rng, STATUS_WEIGHTS)
+        due_date = None
+        if rng.random() >= NO_DUE_DATE_SHARE:
+            # mostly upcoming, with a tail of overdue work
+            due_date = today + timedelta(days=round(rng.gauss(10, 20)))
+        completed_at = None
+        if status == "done":
+            completed_at = now - timedelta(minutes=rng.randrange(90 * 24 * 60))
+        title = " ".join(rng.sample(_WORDS, rng.randint(2, 5))).capitalize()
+        description = ""
+        if rng.random() < DESCRIPTION_SHARE:
+            description = " ".join(rng.choices(_WORDS, k=rng.randint(10, 60)))
+        yield Task(
+            user=user,
+            title=title,
+            description=description,
+            status=status,
+            priority=_choice(rng, PRIORITY_WEIGHTS),
+            due_date=due_date,
+            completed_at=completed_at,
+        )
+
+
+def seed_data(users, tasks_per_user, prefix="bench", seed=0, batch_size=2000):
+    """
+    Create ``users`` users named <prefix>00000.. with ``tasks_per_user``
+    tasks each. All users share SEED_PASSWORD. Returns the users created.
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+    password = make_password(SEED_PASSWORD)  # hashed once, not per user
+    start = User.objects.filter(username__startswith=prefix).count()
+    created = User.objects.bulk_create(
+        User(username=f"{prefix}{i:05d}", password=password)
+        for i in range(start, start + users)
+    )
+    # bulk_create only sets primary keys on some backends
+    created = list(
+        User.objects.filter(username__in=[user.username for user in created]).order_by("pk")
+    )
+
+    today, now = timezone.localdate(), timezone.now()
+    batch = []
+    for user in created:
+        for task in seed_tasks(user, tasks_per_user, rng, today, now):
+            batch.append(task)
+            if len(batch) >= batch_size:
+                with transaction.atomic():
+                    Task.objects.bulk_create(batch)
+                batch = []
+    if batch:
+        with transaction.atomic():
+            Task.objects.bulk_create(batch)
+    return created
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements run on the default connection inside the block."""
+    counter = {"queries": 0}
+
+    def wrapper(execute, sql, params, many, context):
+        counter["queries"] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield counter
+
+
+def measure(run, iterations=50, warmup=5, rollback=False):
+    """
+    Time ``run()`` and summarize latency (ms percentiles), SQL queries per
+    call and the peak Python allocation of a single call. With
+    ``rollback``, every call runs in a transaction that is rolled back so
+    writes do not grow the dataset between iterations.
+    """
+
+    def call():
+        if not rollback:
+            return run()
+        with transaction.atomic():
+            result = run()
+            transaction.set_rollback(True)
+        return result
+
+    for _ in range(warmup):
+        call()
+
+    latencies = []
+    queries = []
+    for _ in range(iterations):
+        with count_queries() as counter:
+            started = time.perf_counter()
+            call()
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(counter["queries"])
+
+    # tracemalloc slows everything down, so memory gets a pass of its own
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "queries": max(queries, default=0),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+# task_list's query, and an edit (which also updates the search index)
+MIXED_READ_SQL = (
+    "SELECT id, title, status, priority, due_date FROM core_task "
+    "WHERE user_id = %s ORDER BY due_date, id LIMIT 50"
+)
+MIXED_WRITE_SQL = "UPDATE core_task SET title = %s WHERE id = %s"
+
+
+def mixed_workload(path, pragmas, threads=8, seconds=5.0, write_share=0.2, seed=0):
+    """
+    Run task_list reads and task edits against the SQLite file ``path``
+    from ``threads`` connections for ``seconds``, each connection set up
+    with ``pragmas``. Statements failing with "database is locked" are
+    counted, not retried. Returns throughput and latency.
+    """
+    pragmas = dict(pragmas)
+    setup = sqlite3.connect(path)
+    try:
+        # the journal mode is stored in the file; set it once, up front
+        apply_pragmas(setup, {"journal_mode": pragmas.pop("journal_mode", "delete")})
+        tasks = setup.execute("SELECT id, user_id FROM core_task").fetchall()
+    finally:
+        setup.close()
+    if not tasks:
+        raise ValueError("no tasks to read and write; run seed_data first")
+    read_sql = MIXED_READ_SQL.replace("%s", "?")
+    write_sql = MIXED_WRITE_SQL.replace("%s", "?")
+
+    def worker(number):
+        rng = random.Random(seed + number)
+        db = sqlite3.connect(path, isolation_level=None)
+        apply_pragmas(db, pragmas)
+        counts = {"reads": 0, "writes": 0, "locked": 0}
+        latencies = []
+        try:
+            while (started := time.perf_counter()) < deadline:
+                task_id, user_id = rng.choice(tasks)
+                try:
+                    if rng.random() < write_share:
+                        db.execute(write_sql, (f"Edited by {number}", task_id))
+                        counts["writes"] += 1
+                    else:
+                        db.execute(read_sql, (user_id,)).fetchall()
+                        counts["reads"] += 1
+                except sqlite3.OperationalError as exc:
+                    if "locked" not in str(exc):
+                        raise
+                    counts["locked"] += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+        return counts, latencies
+
+    deadline = time.perf_counter() + seconds
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(worker, range(threads)))
+
+    totals = {"reads": 0, "writes": 0, "locked": 0}
+    latencies = []
+    for counts, worker_latencies in results:
+        for key, value in counts.items():
+            totals[key] += value
+        latencies.extend(worker_latencies)
+    return {
+        **totals,
+        "reads_per_second": round(totals["reads"] / seconds, 1),
+        "writes_per_second": round(totals["writes"] / seconds, 1),
+        "ops_per_second": round((totals["reads"] + totals["writes"]) / seconds, 1),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
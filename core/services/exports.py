@@ -0,0 +1,58 @@
+import csv
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+EXPORT_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "due_date",
+    "status",
+    "priority",
+    "created_at",
+    "updated_at",
+    "completed_at",
+)
+
+
+class _Line:
+    """File-like object whose write() hands back what it was given, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def export_lines(queryset, fmt, fields=EXPORT_FIELDS, columns=None, chunk_size=2000):
+    """
+    Yield ``queryset`` as CSV or JSONL text, a chunk of rows at a time.
+    Rows are streamed from the database with iterator(), so memory stays
+    flat however many tasks there are. ``columns`` names the output columns
+    when they differ from the looked-up ``fields`` (e.g. user__username).
+    """
+    columns = tuple(columns or fields)
+    rows = queryset.order_by("pk").values_list(*fields).iterator(chunk_size=chunk_size)
+
+    if fmt == "csv":
+        writer = csv.writer(_Line())
+        # header first, so the response starts before the first query returns
+        yield writer.writerow(columns)
+
+        def encode(row):
+            return writer.writerow([_csv_value(value) for value in row])
+    else:
+        encoder = DjangoJSONEncoder()
+
+        def encode(row):
+            return encoder.encode(dict(zip(columns, row))) + "\n"
+
+    while chunk := list(islice(rows, chunk_size)):
+        yield "".join(encode(row) for row in chunk)
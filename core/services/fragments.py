@@ -0,0 +1,65 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+TASK_ROW_TEMPLATE = "core/task_row.html"
+# Bump when the row template changes so old fragments are not served.
+TASK_ROW_VERSION = 2
+
+_fragment_counter = metrics.CacheCounter(
+    "task_row_cache_requests_total", "task_list row fragment cache lookups by result."
+)
+
+
+def task_row_key(row, today):
+    # updated_at changes on every write; today flips is_overdue at midnight
+    return (
+        f"task_row:v{TASK_ROW_VERSION}:{row.id}:"
+        f"{row.updated_at.timestamp()}:{today.isoformat()}"
+    )
+
+
+def _render_missing(keys, rows, cached):
+    fragments = []
+    missing = {}
+    for key, row in zip(keys, rows):
+        html = cached.get(key)
+        if html is None:
+            html = missing[key] = render_to_string(TASK_ROW_TEMPLATE, {"task": row})
+        fragments.append(html)
+
+    hits = len(rows) - len(missing)
+    _fragment_counter.record(hits=hits, misses=len(missing))
+    logger.debug("task rows: %d cached, %d rendered", hits, len(missing))
+    return fragments, missing
+
+
+def render_task_rows(rows, today):
+    """
+    Rendered HTML for each task_list row, reusing cached fragments. All
+    lookups and stores go to the cache in one round trip each.
+    """
+    keys = [task_row_key(row, today) for row in rows]
+    fragments, missing = _render_missing(keys, rows, cache.get_many(keys))
+    if missing:
+        cache.set_many(missing, settings.TASK_ROW_CACHE_TIMEOUT)
+    return fragments
+
+
+async def arender_task_rows(rows, today):
+    """render_task_rows() for async views."""
+    keys = [task_row_key(row, today) for row in rows]
+    fragments, missing = _render_missing(keys, rows, await cache.aget_many(keys))
+    if missing:
+        await cache.aset_many(missing, settings.TASK_ROW_CACHE_TIMEOUT)
+    return fragments
+
+
+def fragment_cache_info():
+    return _fragment_counter.info()
@@ -0,0 +1,132 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django import forms
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from core.forms import TaskForm
+from core.models import Task
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+_completed_at_field = forms.DateTimeField(required=False)
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (line number, row dict) from a CSV (with a header) or JSONL text
+    stream, one row at a time. A JSONL line that is not a JSON object is
+    yielded as a string so the importer can reject it.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = line
+        yield number, row
+
+
+class TaskImporter:
+    """
+    Validate rows with TaskForm's field rules and insert the valid ones with
+    bulk_create, one transaction per batch. Rejected rows are passed to
+    ``on_error`` and skipped; the import carries on.
+
+    Rows are assigned to ``default_user`` unless they carry a ``user``
+    (username) column.
+    """
+
+    def __init__(self, default_user=None, batch_size=1000, on_error=None):
+        self.default_user = default_user
+        self.batch_size = batch_size
+        self.on_error = on_error or (lambda number, row, errors: None)
+        self._user_ids = {}
+        self.now = timezone.now()
+
+    def _user_id(self, username):
+        if username not in self._user_ids:
+            self._user_ids[username] = (
+                get_user_model().objects.filter(username=username)
+                .values_list("pk", flat=True)
+                .first()
+            )
+        return self._user_ids[username]
+
+    def build(self, row):
+        """A Task for ``row``, or a dict of errors."""
+        if not isinstance(row, dict):
+            return None, {"__all__": ["row is not an object"]}
+
+        username = row.get("user")
+        if username:
+            user_id = self._user_id(username)
+            if user_id is None:
+                return None, {"user": [f"unknown user {username!r}"]}
+        elif self.default_user is not None:
+            user_id = self.default_user.pk
+        else:
+            return None, {"user": ["no user given and no default user"]}
+
+        data = {
+            name: Task._meta.get_field(name).get_default()
+            for name in ("status", "priority")
+        }
+        data.update((key, value) for key, value in row.items() if value not in (None, ""))
+        form = TaskForm(data)
+        errors = {}
+        if not form.is_valid():
+            errors = {field: list(messages) for field, messages in form.errors.items()}
+        try:
+            completed_at = _completed_at_field.clean(row.get("completed_at"))
+        except forms.ValidationError as exc:
+            errors["completed_at"] = exc.messages
+        if errors:
+            return None, errors
+
+        task = form.instance
+        task.user_id = user_id
+        if task.status == "done":
+            task.completed_at = completed_at or self.now
+        return task, None
+
+    def run(self, rows):
+        """Import (line number, row) pairs; returns a summary dict."""
+        imported = rejected = batches = 0
+        started = time.perf_counter()
+        rows = iter(rows)
+        while chunk := list(islice(rows, self.batch_size)):
+            tasks = []
+            for number, row in chunk:
+                task, errors = self.build(row)
+                if errors:
+                    rejected += 1
+                    self.on_error(number, row, errors)
+                else:
+                    tasks.append(task)
+            if tasks:
+                with transaction.atomic():
+                    Task.objects.bulk_create(tasks)
+                imported += len(tasks)
+                batches += 1
+
+        elapsed = time.perf_counter() - started
+        return {
+            "imported": imported,
+            "rejected": rejected,
+            "batches": batches,
+            "elapsed": elapsed,
+            "rate": (imported + rejected) / elapsed if elapsed else 0.0,
+        }
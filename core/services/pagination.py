@@ -0,0 +1,171 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+
+def encode_cursor(direction, values):
+    raw = json.dumps([direction, list(values)], cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded))
+    except (TypeError, ValueError):
+        raise ValueError("malformed cursor")
+    if direction not in ("next", "prev") or not isinstance(values, list):
+        raise ValueError("malformed cursor")
+    return direction, values
+
+
+def requested_page_size(request, default, maximum):
+    """``?page_size=`` clamped to [1, maximum]; ``default`` when absent or bad."""
+    try:
+        size = int(request.GET.get("page_size", default))
+    except ValueError:
+        size = default
+    return max(1, min(size, maximum))
+
+
+def _field(model, key):
+    try:
+        return model._meta.get_field(key)
+    except FieldDoesNotExist:
+        return None
+
+
+def _row_value(row, key):
+    return row[key] if isinstance(row, dict) else getattr(row, key)
+
+
+def _beyond(key, value, forward, nullable):
+    # NULLs sort first, so nothing comes before a NULL and every non-NULL
+    # value comes after one.
+    if value is None:
+        return Q(**{f"{key}__isnull": False}) if forward else None
+    if forward:
+        return Q(**{f"{key}__gt": value})
+    if nullable:
+        return Q(**{f"{key}__lt": value}) | Q(**{f"{key}__isnull": True})
+    return Q(**{f"{key}__lt": value})
+
+
+def _seek(keys, values, forward, nullable):
+    """Rows strictly after (or before) the cursor in (keys) order."""
+    terms = []
+    equal = Q()
+    for key, value in zip(keys, values):
+        beyond = _beyond(key, value, forward, nullable[key])
+        if beyond is not None:
+            terms.append(equal & beyond)
+        if value is None:
+            equal &= Q(**{f"{key}__isnull": True})
+        else:
+            equal &= Q(**{key: value})
+    if not terms:
+        return Q(pk__in=[])
+
+    condition = reduce(or_, terms)
+    # Repeat the leading key as a plain range so the database can seek
+    # straight to the cursor instead of walking the index from the start.
+    lead, lead_value = keys[0], values[0]
+    if lead_value is not None:
+        if forward:
+            condition &= Q(**{f"{lead}__gte": lead_value})
+        elif not nullable[lead]:
+            condition &= Q(**{f"{lead}__lte": lead_value})
+    return condition
+
+
+def _ordering(keys, forward, nullable):
+    ordering = []
+    for key in keys:
+        if not nullable[key]:
+            ordering.append(key if forward else f"-{key}")
+        elif forward:
+            ordering.append(F(key).asc(nulls_first=True))
+        else:
+            ordering.append(F(key).desc(nulls_last=True))
+    return ordering
+
+
+def _page_query(queryset, keys, cursor, page_size):
+    """The query for one page, plus the direction and cursor values."""
+    model = queryset.model
+    fields = {key: _field(model, key) for key in keys}
+    nullable = {key: bool(field and field.null) for key, field in fields.items()}
+
+    direction, values = "next", None
+    if cursor:
+        try:
+            direction, values = decode_cursor(cursor)
+            if len(values) != len(keys):
+                raise ValueError("cursor does not match ordering")
+            values = [
+                fields[key].to_python(value)
+                if fields[key] and value is not None
+                else value
+                for key, value in zip(keys, values)
+            ]
+        except (ValueError, ValidationError):
+            direction, values = "next", None
+
+    forward = direction == "next"
+    qs = queryset
+    if values is not None:
+        qs = qs.filter(_seek(keys, values, forward, nullable))
+    qs = qs.order_by(*_ordering(keys, forward, nullable))[: page_size + 1]
+    return qs, forward, values
+
+
+def _page_result(rows, keys, forward, values, page_size):
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if not forward:
+        rows.reverse()
+
+    def cursor_for(direction, row):
+        return encode_cursor(direction, [_row_value(row, key) for key in keys])
+
+    if forward:
+        has_next, has_prev = has_more, values is not None
+    else:
+        # A "prev" cursor always comes from the page after this one.
+        has_next, has_prev = True, has_more
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_next:
+            next_cursor = cursor_for("next", rows[-1])
+        if has_prev:
+            prev_cursor = cursor_for("prev", rows[0])
+
+    return {
+        "object_list": rows,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        "page_size": page_size,
+    }
+
+
+def keyset_page(queryset, keys, cursor=None, page_size=50):
+    """
+    One page of ``queryset`` ordered by ``keys`` (the last key must be
+    unique, e.g. ``id``). Cost depends on the page size, not on how deep
+    the cursor is. Rows may be model instances, values() dicts or named
+    values_list() rows, as long as every key is selected.
+    """
+    qs, forward, values = _page_query(queryset, keys, cursor, page_size)
+    return _page_result(list(qs), keys, forward, values, page_size)
+
+
+async def akeyset_page(queryset, keys, cursor=None, page_size=50):
+    """keyset_page() for async views."""
+    qs, forward, values = _page_query(queryset, keys, cursor, page_size)
+    return _page_result([row async for row in qs], keys, forward, values, page_size)
@@ -0,0 +1,120 @@
+from collections import Counter
+from contextlib import nullcontext
+
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+
+from core.models import DailyCompletion, Task
+
+
+def _add_completions(user_id, day, count):
+    """Add ``count`` to a rollup, creating it if needed, in one statement."""
+    table = DailyCompletion._meta.db_table
+    connection = connections[router.db_for_write(DailyCompletion)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO "{table}" ("user_id", "day", "count") VALUES (%s, %s, %s) '
+            f'ON CONFLICT ("user_id", "day") DO UPDATE SET "count" = "count" + excluded."count"',
+            [user_id, connection.ops.adapt_datefield_value(day), count],
+        )
+
+
+def adjust_daily_completions(deltas):
+    """Apply {(user_id, day): delta} to the DailyCompletion rollups."""
+    changes = [
+        (user_id, day, delta)
+        for (user_id, day), delta in deltas.items()
+        if delta and day is not None
+    ]
+    # a single change is one statement, which needs no transaction
+    with transaction.atomic() if len(changes) > 1 else nullcontext():
+        for user_id, day, delta in changes:
+            if delta > 0:
+                _add_completions(user_id, day, delta)
+            else:
+                DailyCompletion.objects.filter(user_id=user_id, day=day).update(
+                    count=F("count") + delta
+                )
+
+
+def completion_deltas(tasks, sign=1):
+    deltas = Counter()
+    for task in tasks:
+        day = task.completion_day()
+        if day is not None:
+            deltas[(task.user_id, day)] += sign
+    return deltas
+
+
+def reconcile_daily_completions(user_ids):
+    """
+    Rebuild the rollups of ``user_ids`` from their Task rows. Returns the
+    number of rollup rows created, updated and deleted.
+    """
+    actual = {
+        (row["user_id"], row["day"]): row["count"]
+        for row in Task.objects.filter(
+            user_id__in=user_ids, status="done", completed_at__isnull=False
+        )
+        .annotate(day=TruncDate("completed_at"))
+        .values("user_id", "day")
+        .annotate(count=Count("id"))
+        .order_by()
+    }
+    stored = {
+        (rollup.user_id, rollup.day): rollup
+        for rollup in DailyCompletion.objects.filter(user_id__in=user_ids)
+    }
+
+    to_create = [
+        DailyCompletion(user_id=user_id, day=day, count=count)
+        for (user_id, day), count in actual.items()
+        if (user_id, day) not in stored
+    ]
+    to_update = []
+    to_delete = []
+    for key, rollup in stored.items():
+        count = actual.get(key, 0)
+        if count == 0:
+            to_delete.append(rollup.pk)
+        elif rollup.count != count:
+            rollup.count = count
+            to_update.append(rollup)
+
+    with transaction.atomic():
+        DailyCompletion.objects.bulk_create(to_create)
+        DailyCompletion.objects.bulk_update(to_update, ["count"])
+        DailyCompletion.objects.filter(pk__in=to_delete).delete()
+
+    return {
+        "created": len(to_create),
+        "updated": len(to_update),
+        "deleted": len(to_delete),
+    }
+
+
+def reconcile_users(usernames=(), batch_size=500):
+    """
+    Reconcile the rollups of every user (or only ``usernames``),
+    ``batch_size`` users per transaction. Returns the number of users and
+    the summed counts of reconcile_daily_completions.
+    """
+    users = get_user_model().objects.order_by("pk")
+    if usernames:
+        users = users.filter(username__in=usernames)
+
+    totals = {"created": 0, "updated": 0, "deleted": 0}
+    reconciled = 0
+    last_pk = None
+    while True:
+        batch = users if last_pk is None else users.filter(pk__gt=last_pk)
+        user_ids = list(batch.values_list("pk", flat=True)[:batch_size])
+        if not user_ids:
+            break
+        for key, count in reconcile_daily_completions(user_ids).items():
+            totals[key] += count
+        reconciled += len(user_ids)
+        last_pk = user_ids[-1]
+    return reconciled, totals
@@ -0,0 +1,126 @@
+import re
+from functools import reduce
+from operator import and_
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+
+SEARCH_TABLE = "core_task_fts"
+
+# External-content FTS5 index over core_task(title, description); the
+# triggers keep it in step with every write, including queryset updates.
+# This is the live definition: migration 0009 created the objects from a
+# frozen copy, and SQLite drops a table's triggers when a migration
+# rebuilds it, so rebuild_search_index reinstalls them from here.
+SEARCH_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        title, description, content='core_task', content_rowid='id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS core_task_fts_insert AFTER INSERT ON core_task BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS core_task_fts_delete AFTER DELETE ON core_task BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    # status/priority/reminder updates leave the index alone
+    f"""
+    CREATE TRIGGER IF NOT EXISTS core_task_fts_update
+    AFTER UPDATE OF title, description ON core_task BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {SEARCH_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+_WORD_RE = re.compile(r"\w+")
+_search_ready = {}
+
+
+def search_terms(query):
+    return _WORD_RE.findall(query or "")
+
+
+def fts_query(terms):
+    """
+    An FTS5 MATCH expression requiring every term, the last one as a
+    prefix so results update while the word is still being typed. Terms
+    are quoted, so user input cannot use FTS5 query syntax.
+    """
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_available(using="default"):
+    """Whether the FTS5 index exists on this database (checked once per process)."""
+    if using not in _search_ready:
+        connection = connections[using]
+        _search_ready[using] = (
+            connection.vendor == "sqlite"
+            and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _search_ready[using]
+
+
+async def aprepare_search():
+    """
+    search_available() for every database a search may read, run outside
+    the event loop: it introspects the schema with a blocking query, so
+    async views must call this before building a search.
+    """
+    for using in [DEFAULT_DB_ALIAS, *settings.READ_REPLICAS]:
+        if using not in _search_ready:
+            await sync_to_async(search_available)(using)
+
+
+def search_tasks(queryset, query):
+    """
+    ``queryset`` narrowed to tasks whose title or description contain every
+    word of ``query``, best match first. Uses the FTS5 index ranked by bm25
+    where available; elsewhere falls back to icontains per word, most
+    recently updated first. An empty query matches nothing.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    if not search_available(queryset.db):
+        return queryset.filter(
+            reduce(and_, (Q(title__icontains=t) | Q(description__icontains=t) for t in terms))
+        ).order_by("-updated_at", "-id")
+
+    table = queryset.model._meta.db_table
+    # One join on the index's rowid: SQLite looks up the matches in the
+    # index, joins each to its task by primary key and ranks it there.
+    return queryset.extra(
+        select={"search_rank": f"bm25({SEARCH_TABLE})"},
+        tables=[SEARCH_TABLE],
+        where=[f'{SEARCH_TABLE} MATCH %s', f'{SEARCH_TABLE}.rowid = "{table}"."id"'],
+        params=[fts_query(terms)],
+    ).order_by("search_rank", "-id")
+
+
+def rebuild_search_index(using="default"):
+    """Recreate the FTS5 table and triggers if missing and reindex every task."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for statement in SEARCH_SCHEMA:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")
+        (count,) = cursor.fetchone()
+    _search_ready[using] = True
+    return count
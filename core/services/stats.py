@@ -1,58 +1,107 @@
-from django.db.models import Count
-from core.models import Task
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from core import metrics
+from core.models import DailyCompletion, Task
+from core.routers import primary_reads, replica_alias
 from django.utils import timezone
-from django.db.models.functions import TruncDate
 
 
-def task_completion_stats(user):
-    qs = Task.objects.filter(user=user)
+def _completion_aggregates():
+    aggregates = {"total": Count("id")}
+    for status, _ in Task.STATUS_CHOICES:
+        aggregates[f"status_{status}"] = Count("id", filter=Q(status=status))
+    for priority, _ in Task.PRIORITY_CHOICES:
+        aggregates[f"priority_{priority}"] = Count("id", filter=Q(priority=priority))
+    return aggregates
 
-    total = qs.count()
-    completed = qs.filter(status="done").count()
+
+def _completion_stats(counts):
+    total = counts["total"]
+    completed = counts["status_done"]
     open_tasks = total - completed
 
     completion_rate = (
         round((completed / total) * 100, 1) if total > 0 else 0
     )
 
-    by_status = (
-        qs.values("status")
-        .annotate(count=Count("id"))
-    )
+    by_status = [
+        {"status": status, "count": counts[f"status_{status}"]}
+        for status, _ in Task.STATUS_CHOICES
+    ]
 
-    by_priority = (
-        qs.values("priority")
-        .annotate(count=Count("id"))
-    )
+    by_priority = [
+        {"priority": priority, "count": counts[f"priority_{priority}"]}
+        for priority, _ in Task.PRIORITY_CHOICES
+    ]
 
     return {
         "total": total,
         "completed": completed,
         "open": open_tasks,
         "completion_rate": completion_rate,
-        "by_status": list(by_status),
-        "by_priority": list(by_priority),
+        "by_status": by_status,
+        "by_priority": by_priority,
     }
 
 
-def weekly_productivity(user):
-    today = timezone.now().date()
-    start_date = today - timezone.timedelta(days=6)
+def task_completion_stats(user):
+    # One pass over the user's tasks: every figure is a filtered COUNT in
+    # the same aggregate query.
+    counts = (
+        Task.objects.using(replica_alias()).filter(user=user)
+        .aggregate(**_completion_aggregates())
+    )
+    return _completion_stats(counts)
+
+
+async def atask_completion_stats(user):
+    counts = await (
+        Task.objects.using(replica_alias()).filter(user=user)
+        .aaggregate(**_completion_aggregates())
+    )
+    return _completion_stats(counts)
+
+
+PRODUCTIVITY_RANGES = (7, 30, 90, 365)
+
+
+def _productivity_query(user, days):
+    today = timezone.localdate()
+    start_date = today - timezone.timedelta(days=days - 1)
 
+    # Read the DailyCompletion rollup: one row per day at most, however many
+    # tasks were completed.
     qs = (
-        Task.objects.filter(
+        DailyCompletion.objects.using(replica_alias()).filter(
             user=user,
-            status="done",
-            completed_at__date__range=(start_date, today),
+            day__range=(start_date, today),
+            count__gt=0,
         )
-        .annotate(day=TruncDate("completed_at"))
-        .values("day")
-        .annotate(count=Count("id"))
         .order_by("day")
+        .values_list("day", "count")
     )
+    return qs, start_date, today
+
+
+def _productivity(rows, start_date, today, days, dense):
+    if dense:
+        # Every day in the window, zero-filled
+        counts = dict(rows)
+        days_in_range = (
+            start_date + timezone.timedelta(days=i) for i in range(days)
+        )
+        result = [
+            {"day": str(day), "count": counts.get(day, 0)}
+            for day in days_in_range
+        ]
+        return {"result": result, "fake": False}
 
     # Convert date objects to strings for JSON serialization
-    result = [{"day": str(item["day"]), "count": item["count"]} for item in qs]
+    result = [{"day": str(day), "count": count} for day, count in rows]
     fake = False
     if not result:
         # Sample data for demonstration
@@ -62,6 +111,133 @@ def weekly_productivity(user):
         ]
         fake = True
     data = {"result": result, "fake": fake}
-    # print(data)
-    # print(result)
     return data
+
+
+def weekly_productivity(user, days=7, dense=False):
+    qs, start_date, today = _productivity_query(user, days)
+    return _productivity(list(qs), start_date, today, days, dense)
+
+
+async def aweekly_productivity(user, days=7, dense=False):
+    qs, start_date, today = _productivity_query(user, days)
+    rows = [row async for row in qs]
+    return _productivity(rows, start_date, today, days, dense)
+
+
+# Cached stats
+#
+# Entries are keyed by user and the user's data version. Any task write
+# replaces the version (see core.signals), so stale entries are never read
+# again and simply expire. The version is a nanosecond timestamp of the
+# last change, which also makes it usable as a Last-Modified value.
+
+_MISSING = object()
+_cache_counter = metrics.CacheCounter(
+    "stats_cache_requests_total", "Stats cache lookups by result."
+)
+
+
+def _version_key(user_id):
+    return f"stats:version:{user_id}"
+
+
+def stats_version(user):
+    user_id = getattr(user, "pk", user)
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Unknown or evicted: start a fresh version so nothing cached under
+        # an older one can be picked up again.
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def invalidate_user_stats(*user_ids):
+    version = time.time_ns()
+    cache.set_many(
+        {_version_key(user_id): version for user_id in user_ids}, timeout=None
+    )
+
+
+def _cached(user, name, compute, *key_parts):
+    version = stats_version(user)
+    key = ":".join(map(str, ("stats", name, user.pk, version, *key_parts)))
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _cache_counter.record(hits=1)
+        return value
+    _cache_counter.record(misses=1)
+    # The value is cached under this version for good, so it must not come
+    # from a replica that has not caught up with the change yet.
+    with primary_reads(changed_at=version):
+        value = compute(user)
+    cache.set(key, value, settings.STATS_CACHE_TIMEOUT)
+    return value
+
+
+async def astats_version(user):
+    user_id = getattr(user, "pk", user)
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key, version)
+    return version
+
+
+async def _acached(user, name, compute, *key_parts):
+    version = await astats_version(user)
+    key = ":".join(map(str, ("stats", name, user.pk, version, *key_parts)))
+    value = await cache.aget(key, _MISSING)
+    if value is not _MISSING:
+        _cache_counter.record(hits=1)
+        return value
+    _cache_counter.record(misses=1)
+    with primary_reads(changed_at=version):
+        value = await compute(user)
+    await cache.aset(key, value, settings.STATS_CACHE_TIMEOUT)
+    return value
+
+
+def cached_task_completion_stats(user):
+    return _cached(user, "completion", task_completion_stats)
+
+
+def cached_weekly_productivity(user, days=7, dense=False):
+    # The window moves at midnight even when no task changes.
+    return _cached(
+        user,
+        "weekly",
+        lambda user: weekly_productivity(user, days=days, dense=dense),
+        days,
+        int(dense),
+        timezone.localdate(),
+    )
+
+
+async def acached_task_completion_stats(user):
+    return await _acached(user, "completion", atask_completion_stats)
+
+
+async def acached_weekly_productivity(user, days=7, dense=False):
+    return await _acached(
+        user,
+        "weekly",
+        lambda user: aweekly_productivity(user, days=days, dense=dense),
+        days,
+        int(dense),
+        timezone.localdate(),
+    )
+
+
+def stats_last_modified(user):
+    """When the user's tasks last changed, as far as the cache knows."""
+    return datetime.fromtimestamp(stats_version(user) / 1e9, tz=dt_timezone.utc)
+
+
+def stats_cache_info():
+    return _cache_counter.info()
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.auth import forget_session, invalidate_user
+from core.models import Task, tasks_bulk_changed
+from core.services.rollups import (
+    adjust_daily_completions,
+    completion_deltas,
+    reconcile_daily_completions,
+)
+from core.services.stats import invalidate_user_stats
+
+
+@receiver(pre_save, sender=Task)
+def task_saving(sender, instance, **kwargs):
+    # Instances not loaded from the database (or loaded without the tracked
+    # fields) don't know what is currently stored.
+    if not hasattr(instance, "_saved_state"):
+        saved = None
+        if instance.pk is not None:
+            saved = Task.objects.filter(pk=instance.pk).only(
+                *Task.TRACKED_FIELDS
+            ).first()
+        instance._saved_state = saved.tracked_state() if saved else None
+
+    saved_state = instance._saved_state
+    if saved_state and (
+        saved_state["status"] != instance.status
+        or saved_state["due_date"] != instance.due_date
+    ):
+        # a rescheduled or reopened task is reminded afresh once overdue
+        instance.last_reminded_at = None
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, **kwargs):
+    saved_state = instance._saved_state
+    old_day = instance.completion_day(saved_state) if saved_state else None
+    new_day = instance.completion_day()
+    if old_day != new_day:
+        adjust_daily_completions({
+            (instance.user_id, old_day): -1,
+            (instance.user_id, new_day): 1,
+        })
+    instance._saved_state = instance.tracked_state()
+    invalidate_user_stats(instance.user_id)
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    saved_state = getattr(instance, "_saved_state", None)
+    day = instance.completion_day(saved_state)
+    if day is not None:
+        adjust_daily_completions({(instance.user_id, day): -1})
+    invalidate_user_stats(instance.user_id)
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def tasks_bulk_changed_handler(
+    sender, user_ids, fields=(), objs=(), deleted=(), **kwargs
+):
+    if objs:
+        adjust_daily_completions(completion_deltas(objs))
+    if deleted:
+        adjust_daily_completions(completion_deltas(deleted, sign=-1))
+    if {"status", "completed_at"} & set(fields):
+        reconcile_daily_completions(user_ids)
+    invalidate_user_stats(*user_ids)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    # password, is_active and the session auth hash may have changed
+    invalidate_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, request, **kwargs):
+    # sent before the session is flushed, so its key is still known
+    forget_session(request.session.session_key)
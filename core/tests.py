@@ -1,11 +1,90 @@
-from django.test import TestCase, Client
+import asyncio
+import csv
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, router
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+from django.test import TestCase, TransactionTestCase, Client, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
-from .models import Task
+from . import jobs, metrics
+from .db import apply_pragmas, pragma_report, pragmas_in_effect
+from .emails import send_overdue_task_reminders
+from .middleware import request_budget
+from .routers import PIN_COOKIE
+from .models import DailyCompletion, Job, ReminderRun, Task
 from .forms import TaskForm
-from .services.stats import task_completion_stats, weekly_productivity
+from . import async_urls, async_views
+from . import urls as core_urls
+from .services.fragments import fragment_cache_info, render_task_rows
+from .services.pagination import keyset_page
+from .services import search
+from .services.search import search_tasks
+from .services.stats import (
+    cached_task_completion_stats,
+    cached_weekly_productivity,
+    stats_cache_info,
+    task_completion_stats,
+    weekly_productivity,
+)
+
+
+class QueryPlanMixin:
+    """Run EXPLAIN QUERY PLAN over every SELECT issued inside a block"""
+
+    # "SCAN core_task" or "SCAN t USING INDEX ..." walk the whole table or
+    # index; "SEARCH" and temp b-trees used for sorting are fine, as are FTS5
+    # MATCH queries ("SCAN t VIRTUAL TABLE INDEX 0:M...").
+    table_scan_re = re.compile(r"^SCAN (?!CONSTANT ROW)(?!\S+ VIRTUAL TABLE INDEX \d+:=?M)")
+
+    @contextmanager
+    def assertNoTableScans(self, allow_sort=True):
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            yield queries
+
+        selects = [q for q in queries if q[0].lstrip().upper().startswith("SELECT")]
+        self.assertTrue(selects, "no SELECT queries were captured")
+        for sql, params in selects:
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+                plan = [row[-1] for row in cursor.fetchall()]
+            scans = [step for step in plan if self.table_scan_re.match(step)]
+            self.assertFalse(
+                scans,
+                f"table scan in query plan:\n{sql}\nparams={params}\nplan={plan}",
+            )
+            if not allow_sort:
+                self.assertNotIn(
+                    "USE TEMP B-TREE FOR ORDER BY", plan,
+                    f"ordering not served by an index:\n{sql}\nplan={plan}",
+                )
 
 
 class TaskModelTestCase(TestCase):
@@ -224,6 +303,7 @@ class TaskViewsTestCase(TestCase):
     
     def setUp(self):
         """Set up test client and user"""
+        cache.clear()
         self.client = Client()
         self.user = User.objects.create_user(
             username='testuser',
@@ -433,7 +513,7 @@ class TaskViewsTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'core/stats.html')
         self.assertIn('stats', response.context)
-        self.assertIn('weekly_data', response.context)
+        self.assertContains(response, reverse('stats_productivity'))
     
     def test_user_logout(self):
         """Test that user can logout and loses access to protected views"""
@@ -511,6 +591,30 @@ class TaskStatsTestCase(TestCase):
         self.assertEqual(by_priority['medium'], 1)
         self.assertEqual(by_priority['high'], 1)
     
+    def test_task_completion_stats_single_query(self):
+        """Test all completion stats come from one aggregate query"""
+        Task.objects.create(user=self.user, title='Task 1', status='done', priority='high')
+        Task.objects.create(user=self.user, title='Task 2', status='todo', priority='low')
+        with self.assertNumQueries(1):
+            stats = task_completion_stats(self.user)
+        self.assertEqual(stats['total'], 2)
+        self.assertEqual(stats['completion_rate'], 50.0)
+
+    def test_task_completion_stats_zero_filled(self):
+        """Test breakdowns list every status and priority, even unused ones"""
+        Task.objects.create(user=self.user, title='Task 1', status='doing', priority='high')
+        stats = task_completion_stats(self.user)
+        self.assertEqual(stats['by_status'], [
+            {'status': 'todo', 'count': 0},
+            {'status': 'doing', 'count': 1},
+            {'status': 'done', 'count': 0},
+        ])
+        self.assertEqual(stats['by_priority'], [
+            {'priority': 'high', 'count': 1},
+            {'priority': 'medium', 'count': 0},
+            {'priority': 'low', 'count': 0},
+        ])
+
     def test_weekly_productivity_empty(self):
         """Test weekly productivity with no completed tasks"""
         data = weekly_productivity(self.user)
@@ -544,3 +648,2240 @@ class TaskStatsTestCase(TestCase):
         data = weekly_productivity(self.user)
         self.assertEqual(len(data['result']), 3)
         self.assertFalse(data['fake'])
+
+
+class QueryBudgetMixin:
+    """Assert requests stay within their REQUEST_BUDGETS query budget"""
+
+    def assertQueryBudget(self, url_name, request, method='GET'):
+        """Run ``request()`` (including any streamed body) against the route's budget"""
+        budget = request_budget(url_name, method)
+        self.assertIn('queries', budget, f'no query budget for {url_name}')
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLessEqual(
+            len(queries), budget['queries'],
+            f'{url_name} ran {len(queries)} queries, budget {budget["queries"]}:\n'
+            + '\n'.join(q['sql'] for q in queries),
+        )
+        return response
+
+
+class TaskQueryPlanTestCase(QueryPlanMixin, TestCase):
+    """Every service and view query must be served by an index"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.today = timezone.now().date()
+        for i, status in enumerate(['todo', 'doing', 'done'] * 3):
+            Task.objects.create(
+                user=self.user,
+                title=f'Task {i}',
+                status=status,
+                priority=['high', 'medium', 'low'][i % 3],
+                due_date=self.today + timedelta(days=i - 4),
+                completed_at=timezone.now() if status == 'done' else None,
+            )
+        self.task = Task.objects.first()
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_stats_services(self):
+        """Test the stats service queries use indexes"""
+        with self.assertNoTableScans():
+            task_completion_stats(self.user)
+            weekly_productivity(self.user)
+
+    def test_overdue_reminders(self):
+        """Test the overdue reminder scan and claims use indexes"""
+        with self.assertNoTableScans():
+            send_overdue_task_reminders()
+        # later runs are bounded by the stored watermark
+        with self.assertNoTableScans():
+            send_overdue_task_reminders()
+
+    def test_task_list_views(self):
+        """Test every filter/sort combination of task_list uses indexes"""
+        for filter_type in ['today', 'week', 'done', 'all']:
+            for sort_type in ['due_date', 'priority']:
+                with self.subTest(filter=filter_type, sort=sort_type):
+                    with self.assertNoTableScans():
+                        response = self.client.get(
+                            reverse('task_list'),
+                            {'filter': filter_type, 'sort': sort_type},
+                        )
+                    self.assertEqual(response.status_code, 200)
+
+    def test_task_list_priority_order_from_index(self):
+        """Test sorting all tasks by priority needs no separate sort step"""
+        # (narrow due-date filters may still prefer the due_date index)
+        with self.assertNoTableScans(allow_sort=False):
+            self.client.get(reverse('task_list'), {'filter': 'all', 'sort': 'priority'})
+
+    def test_task_list_deep_page(self):
+        """Test a cursor page seeks through the index"""
+        first = self.client.get(
+            reverse('task_list'), {'filter': 'all', 'page_size': 2}
+        )
+        cursor = first.context['page']['next_cursor']
+        for sort_type in ['due_date', 'priority']:
+            with self.subTest(sort=sort_type):
+                with self.assertNoTableScans():
+                    response = self.client.get(
+                        reverse('task_list'),
+                        {'filter': 'all', 'sort': sort_type, 'cursor': cursor},
+                    )
+                self.assertEqual(response.status_code, 200)
+
+    def test_task_detail_views(self):
+        """Test the stats and single-task views use indexes"""
+        for url in [
+            reverse('stats'),
+            reverse('stats_productivity') + '?days=365',
+            reverse('task_update', kwargs={'pk': self.task.pk}),
+            reverse('task_delete', kwargs={'pk': self.task.pk}),
+        ]:
+            with self.subTest(url=url):
+                with self.assertNoTableScans():
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+
+class KeysetPaginationTestCase(TestCase):
+    """Tests for keyset pagination of task_list"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        today = timezone.now().date()
+        # NULL due dates and ties on due_date exercise every cursor branch
+        due_dates = [None, None, today, today, today, today + timedelta(days=1), None]
+        for i, due_date in enumerate(due_dates):
+            Task.objects.create(user=self.user, title=f'Task {i}', due_date=due_date)
+        self.ordered = list(
+            Task.objects.order_by('due_date', 'id').values_list('id', flat=True)
+        )
+
+    def walk(self, keys, page_size):
+        qs = Task.objects.filter(user=self.user)
+        pages = [keyset_page(qs, keys, page_size=page_size)]
+        while pages[-1]['next_cursor']:
+            pages.append(keyset_page(qs, keys, pages[-1]['next_cursor'], page_size))
+        return pages
+
+    def test_forward_walk_visits_every_task_once(self):
+        """Test following next cursors yields the full ordering"""
+        for page_size in [1, 2, 3, 10]:
+            pages = self.walk(('due_date', 'id'), page_size)
+            ids = [task.id for page in pages for task in page['object_list']]
+            self.assertEqual(ids, self.ordered)
+            self.assertIsNone(pages[0]['prev_cursor'])
+
+    def test_backward_walk_matches_forward_pages(self):
+        """Test prev cursors return the same pages in reverse"""
+        qs = Task.objects.filter(user=self.user)
+        pages = self.walk(('due_date', 'id'), 2)
+        for earlier, later in zip(pages, pages[1:]):
+            back = keyset_page(qs, ('due_date', 'id'), later['prev_cursor'], 2)
+            self.assertEqual(
+                [t.id for t in back['object_list']],
+                [t.id for t in earlier['object_list']],
+            )
+            # only the first page has nothing before it
+            self.assertEqual(back['prev_cursor'] is None, earlier is pages[0])
+
+    def test_values_rows(self):
+        """Test pagination over values() rows"""
+        qs = Task.objects.filter(user=self.user).values('id', 'due_date')
+        page = keyset_page(qs, ('due_date', 'id'), page_size=3)
+        page = keyset_page(qs, ('due_date', 'id'), page['next_cursor'], 3)
+        self.assertEqual([row['id'] for row in page['object_list']], self.ordered[3:6])
+
+    def test_view_pages_and_bad_cursor(self):
+        """Test task_list exposes cursors and ignores malformed ones"""
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('task_list')
+        response = self.client.get(url, {'filter': 'all', 'page_size': 4})
+        self.assertEqual(len(response.context['tasks']), 4)
+        cursor = response.context['page']['next_cursor']
+        self.assertContains(response, cursor)
+
+        response = self.client.get(url, {'filter': 'all', 'page_size': 4, 'cursor': cursor})
+        self.assertEqual(len(response.context['tasks']), 3)
+        self.assertIsNone(response.context['page']['next_cursor'])
+
+        response = self.client.get(url, {'filter': 'all', 'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['tasks']), 7)
+
+    def test_view_page_size_is_clamped(self):
+        """Test page_size is limited to the configured maximum"""
+        self.client.login(username='testuser', password='testpass123')
+        with self.settings(TASK_LIST_MAX_PAGE_SIZE=2):
+            response = self.client.get(reverse('task_list'), {'filter': 'all', 'page_size': 500})
+        self.assertEqual(len(response.context['tasks']), 2)
+
+
+class StatsCacheTestCase(TestCase):
+    """Tests for the per-user stats cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        self.task = Task.objects.create(user=self.user, title='Task 1')
+
+    def test_hit_runs_no_queries(self):
+        """Test a cache hit does not touch the database"""
+        cached_task_completion_stats(self.user)
+        cached_weekly_productivity(self.user)
+        with self.assertNumQueries(0):
+            stats = cached_task_completion_stats(self.user)
+            cached_weekly_productivity(self.user)
+        self.assertEqual(stats['total'], 1)
+
+    def test_counters(self):
+        """Test hits and misses are counted"""
+        before = stats_cache_info()
+        cached_task_completion_stats(self.user)
+        cached_task_completion_stats(self.user)
+        after = stats_cache_info()
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 1)
+
+    def test_save_and_delete_invalidate(self):
+        """Test task saves and deletes invalidate only the owner's stats"""
+        cached_task_completion_stats(self.user)
+        cached_task_completion_stats(self.other)
+
+        Task.objects.create(user=self.user, title='Task 2', status='done')
+        self.assertEqual(cached_task_completion_stats(self.user)['completed'], 1)
+
+        self.task.status = 'done'
+        self.task.save()
+        self.assertEqual(cached_task_completion_stats(self.user)['completed'], 2)
+
+        self.task.delete()
+        self.assertEqual(cached_task_completion_stats(self.user)['total'], 1)
+
+        with self.assertNumQueries(0):
+            cached_task_completion_stats(self.other)
+
+    def test_bulk_writes_invalidate(self):
+        """Test queryset update and bulk_create invalidate the cache"""
+        cached_task_completion_stats(self.user)
+        Task.objects.filter(user=self.user).update(status='done')
+        self.assertEqual(cached_task_completion_stats(self.user)['completed'], 1)
+
+        Task.objects.bulk_create([Task(user=self.user, title='Bulk')])
+        self.assertEqual(cached_task_completion_stats(self.user)['total'], 2)
+
+    def test_views_invalidate(self):
+        """Test the create, update and delete views invalidate the cache"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.get(reverse('stats'))
+
+        self.client.post(reverse('task_create'), {
+            'title': 'New', 'status': 'done', 'priority': 'high'
+        })
+        response = self.client.get(reverse('stats'))
+        self.assertEqual(response.context['stats']['completed'], 1)
+
+        self.client.post(reverse('task_update', kwargs={'pk': self.task.pk}), {
+            'title': 'Task 1', 'status': 'done', 'priority': 'low'
+        })
+        response = self.client.get(reverse('stats'))
+        self.assertEqual(response.context['stats']['completed'], 2)
+
+        self.client.post(reverse('task_delete', kwargs={'pk': self.task.pk}))
+        response = self.client.get(reverse('stats'))
+        self.assertEqual(response.context['stats']['total'], 1)
+
+    def test_admin_delete_action_invalidates(self):
+        """Test the admin bulk delete action invalidates the cache"""
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'adminpass')
+        self.client.force_login(admin)
+        cached_task_completion_stats(self.user)
+        self.client.post(reverse('admin:core_task_changelist'), {
+            'action': 'delete_selected',
+            '_selected_action': [self.task.pk],
+            'post': 'yes',
+        })
+        self.assertEqual(cached_task_completion_stats(self.user)['total'], 0)
+
+
+class DailyCompletionTestCase(TestCase):
+    """Tests for the incrementally maintained completion rollup"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.now = timezone.now()
+        self.today = timezone.localdate(self.now)
+
+    def rollups(self):
+        return {
+            day: count
+            for day, count in DailyCompletion.objects.filter(
+                user=self.user, count__gt=0
+            ).values_list('day', 'count')
+        }
+
+    def test_completion_moves_between_days(self):
+        """Test saves move a task into, across and out of day rollups"""
+        task = Task.objects.create(user=self.user, title='Task', status='todo')
+        self.assertEqual(self.rollups(), {})
+
+        task.status = 'done'
+        task.completed_at = self.now
+        task.save()
+        self.assertEqual(self.rollups(), {self.today: 1})
+
+        task = Task.objects.get(pk=task.pk)
+        task.completed_at = self.now - timedelta(days=2)
+        task.save()
+        self.assertEqual(self.rollups(), {self.today - timedelta(days=2): 1})
+
+        task.status = 'doing'
+        task.save()
+        self.assertEqual(self.rollups(), {})
+
+    def test_delete_decrements(self):
+        """Test deleting done tasks decrements their day"""
+        for i in range(3):
+            Task.objects.create(
+                user=self.user, title=f'Task {i}', status='done', completed_at=self.now
+            )
+        Task.objects.filter(user=self.user).first().delete()
+        self.assertEqual(self.rollups(), {self.today: 2})
+        Task.objects.filter(user=self.user).delete()
+        self.assertEqual(self.rollups(), {})
+
+    def test_unloaded_instance_save(self):
+        """Test saving an instance that was not loaded from the database"""
+        task = Task.objects.create(
+            user=self.user, title='Task', status='done', completed_at=self.now
+        )
+        Task(
+            pk=task.pk, user=self.user, title='Task', status='todo',
+            created_at=task.created_at,
+        ).save()
+        self.assertEqual(self.rollups(), {})
+
+    def test_bulk_writes(self):
+        """Test bulk_create and queryset update keep rollups consistent"""
+        Task.objects.bulk_create([
+            Task(user=self.user, title=f'Task {i}', status='done', completed_at=self.now)
+            for i in range(4)
+        ])
+        self.assertEqual(self.rollups(), {self.today: 4})
+
+        ids = list(Task.objects.filter(user=self.user).values_list('id', flat=True)[:3])
+        Task.objects.filter(pk__in=ids).update(status='todo')
+        self.assertEqual(self.rollups(), {self.today: 1})
+
+    def test_weekly_productivity_reads_rollup(self):
+        """Test weekly_productivity cost does not depend on task count"""
+        Task.objects.bulk_create([
+            Task(
+                user=self.user, title=f'Task {i}', status='done',
+                completed_at=self.now - timedelta(days=i % 3),
+            )
+            for i in range(30)
+        ])
+        with self.assertNumQueries(1):
+            data = weekly_productivity(self.user)
+        self.assertEqual(sum(item['count'] for item in data['result']), 30)
+        self.assertEqual(len(data['result']), 3)
+
+    def test_reconcile_command(self):
+        """Test the command backfills missing and repairs drifted rollups"""
+        Task.objects.create(
+            user=self.user, title='Task 1', status='done', completed_at=self.now
+        )
+        Task.objects.create(
+            user=self.user, title='Task 2', status='done',
+            completed_at=self.now - timedelta(days=1),
+        )
+        DailyCompletion.objects.all().delete()
+        DailyCompletion.objects.create(
+            user=self.user, day=self.today - timedelta(days=5), count=7
+        )
+
+        out = StringIO()
+        call_command('reconcile_completions', '--batch-size', '1', stdout=out)
+        self.assertEqual(self.rollups(), {
+            self.today: 1,
+            self.today - timedelta(days=1): 1,
+        })
+        self.assertIn('2 rollups created', out.getvalue())
+        self.assertIn('1 deleted', out.getvalue())
+
+
+class ProductivityEndpointTestCase(TestCase):
+    """Tests for the productivity JSON endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.now = timezone.now()
+        for i in [0, 0, 3, 20]:
+            Task.objects.create(
+                user=self.user, title=f'Task {i}', status='done',
+                completed_at=self.now - timedelta(days=i),
+            )
+        self.url = reverse('stats_productivity')
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_dense_ranges(self):
+        """Test every range returns one zero-filled entry per day"""
+        for days, total in [(7, 3), (30, 4), (90, 4), (365, 4)]:
+            response = self.client.get(self.url, {'days': days})
+            data = response.json()
+            self.assertEqual(len(data['result']), days)
+            self.assertEqual(data['total'], total)
+            self.assertEqual(data['result'][-1], {
+                'day': str(timezone.localdate()), 'count': 2
+            })
+            self.assertEqual(data['result'][-2]['count'], 0)
+
+    def test_invalid_range(self):
+        """Test unsupported ranges are rejected"""
+        for days in ['14', 'week']:
+            response = self.client.get(self.url, {'days': days})
+            self.assertEqual(response.status_code, 400)
+
+    def test_etag_revalidation(self):
+        """Test a matching ETag gets a 304 without touching task data"""
+        response = self.client.get(self.url, {'days': 30})
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                self.url, {'days': 30}, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(
+            [q for q in queries if 'core_' in q['sql']],
+            'a 304 should not query task data',
+        )
+
+        # another range has its own tag
+        response = self.client.get(self.url, {'days': 7}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_change_refreshes(self):
+        """Test a task change invalidates both validators"""
+        response = self.client.get(self.url, {'days': 7})
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        # Last-Modified has one-second resolution; make the change land later
+        with mock.patch('core.services.stats.time.time_ns', return_value=time.time_ns() + 5 * 10**9):
+            Task.objects.create(
+                user=self.user, title='New', status='done', completed_at=self.now,
+            )
+        response = self.client.get(self.url, {'days': 7}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], 4)
+
+        response = self.client.get(
+            self.url, {'days': 7}, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        """Test Last-Modified revalidation without an ETag"""
+        self.client.get(self.url, {'days': 7})
+        response = self.client.get(
+            self.url, {'days': 7},
+            HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60),
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class OverdueReminderTestCase(TestCase):
+    """Tests for the overdue reminder pipeline"""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.users = [
+            User.objects.create_user(
+                username=f'user{i}', email=f'user{i}@example.com', password='testpass123'
+            )
+            for i in range(3)
+        ]
+        for user in self.users:
+            for days, status in [(3, 'todo'), (1, 'doing'), (2, 'done'), (-1, 'todo')]:
+                Task.objects.create(
+                    user=user, title=f'{user.username} {days} {status}', status=status,
+                    due_date=self.today - timedelta(days=days),
+                )
+
+    def test_one_message_per_user(self):
+        """Test each user gets one message listing only overdue open tasks"""
+        report = send_overdue_task_reminders()
+        self.assertEqual(report['sent'], 3)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ['user0@example.com', 'user1@example.com', 'user2@example.com'],
+        )
+        body = next(m.body for m in mail.outbox if m.to == ['user0@example.com'])
+        self.assertEqual(body, (
+            'These tasks are overdue:\n\n'
+            f'- user0 3 todo (due {self.today - timedelta(days=3)})\n'
+            f'- user0 1 doing (due {self.today - timedelta(days=1)})\n'
+        ))
+
+    def test_batches_share_one_connection(self):
+        """Test messages go out in batches over a single connection"""
+        connection = LocmemEmailBackend()
+        with mock.patch.object(connection, 'open', wraps=connection.open) as opened, \
+                mock.patch.object(connection, 'send_messages', wraps=connection.send_messages) as sends:
+            report = send_overdue_task_reminders(batch_size=2, connection=connection)
+        self.assertEqual(report['sent'], 3)
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual([len(call.args[0]) for call in sends.call_args_list], [2, 1])
+
+    def test_command(self):
+        """Test the management command reports the number sent"""
+        out = StringIO()
+        call_command('send_overdue_emails', stdout=out)
+        self.assertIn('Overdue task emails sent: 3', out.getvalue())
+
+    def test_workers_use_own_connections(self):
+        """Test a thread pool delivers every batch with per-worker connections"""
+        connections = []
+        original = mail.get_connection
+
+        def tracking_connection(*args, **kwargs):
+            connection = original(*args, **kwargs)
+            connections.append(connection)
+            return connection
+
+        with mock.patch('core.emails.get_connection', side_effect=tracking_connection):
+            report = send_overdue_task_reminders(batch_size=1, workers=2)
+        self.assertEqual(report['sent'], 3)
+        self.assertEqual(report['batches'], 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertLessEqual(len(connections), 2)
+
+    def test_rate_limit(self):
+        """Test --rate spaces messages out"""
+        report = send_overdue_task_reminders(batch_size=1, workers=3, rate=20)
+        # three messages at 20/s need at least two 50ms gaps
+        self.assertGreaterEqual(report['elapsed'], 0.09)
+
+    def test_command_dry_run(self):
+        """Test --dry-run reports without sending"""
+        out = StringIO()
+        call_command(
+            'send_overdue_emails', '--dry-run', '--workers', '2', '--rate', '1000', stdout=out
+        )
+        self.assertEqual(mail.outbox, [])
+        self.assertIn('Overdue task emails would be sent: 3', out.getvalue())
+        self.assertIn('msg/s', out.getvalue())
+        self.assertIn('p95', out.getvalue())
+        # a dry run claims nothing
+        self.assertEqual(send_overdue_task_reminders()['sent'], 3)
+
+    def test_rerun_sends_nothing(self):
+        """Test a second run the same day does not remind anyone again"""
+        send_overdue_task_reminders()
+        mail.outbox = []
+        report = send_overdue_task_reminders()
+        self.assertEqual(report['sent'], 0)
+        self.assertEqual(mail.outbox, [])
+        runs = list(ReminderRun.objects.order_by('started_at'))
+        self.assertEqual([run.emails_sent for run in runs], [3, 0])
+        self.assertEqual(runs[0].tasks_reminded, 6)
+        self.assertTrue(all(run.finished_at for run in runs))
+
+    def test_repeat_next_day(self):
+        """Test tasks are reminded again once a new day starts"""
+        send_overdue_task_reminders()
+        mail.outbox = []
+        tomorrow = timezone.now() + timedelta(days=1)
+        with mock.patch('django.utils.timezone.now', return_value=tomorrow):
+            report = send_overdue_task_reminders()
+        self.assertEqual(report['sent'], 3)
+        self.assertEqual(report['tasks'], 6)
+
+    def test_rescheduled_task_is_reminded_again(self):
+        """Test moving an overdue task's due date re-arms its reminder"""
+        send_overdue_task_reminders()
+        mail.outbox = []
+        task = Task.objects.get(title='user1 3 todo')
+        task.due_date = self.today - timedelta(days=10)
+        task.save()
+        report = send_overdue_task_reminders()
+        self.assertEqual(report['sent'], 1)
+        self.assertEqual(mail.outbox[0].to, ['user1@example.com'])
+
+    def test_bulk_update_keeps_reminder_when_unchanged(self):
+        """Test a queryset update re-arms reminders only where status or due date change"""
+        send_overdue_task_reminders()
+        mail.outbox = []
+        tasks = Task.objects.filter(user=self.users[0], status='todo')
+        tasks.update(status='todo')
+        self.assertEqual(send_overdue_task_reminders()['sent'], 0)
+
+        # of the two overdue open tasks, only the one due a day ago moves
+        overdue = Task.objects.filter(
+            user=self.users[0], status__in=['todo', 'doing'], due_date__lt=self.today
+        )
+        overdue.update(
+            due_date=self.today - timedelta(days=3)
+        )
+        report = send_overdue_task_reminders()
+        self.assertEqual(report['sent'], 1)
+        self.assertEqual(report['tasks'], 1)
+        self.assertIn('user0 1 doing', mail.outbox[0].body)
+
+    def test_failed_batch_is_released(self):
+        """Test a crash mid-run neither loses nor duplicates reminders"""
+        connection = LocmemEmailBackend()
+        original = connection.send_messages
+        calls = []
+
+        def flaky_send(messages):
+            calls.append(messages)
+            if len(calls) == 2:
+                raise ConnectionError('SMTP went away')
+            return original(messages)
+
+        with mock.patch.object(connection, 'send_messages', side_effect=flaky_send):
+            with self.assertRaises(ConnectionError):
+                send_overdue_task_reminders(batch_size=1, connection=connection)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIsNone(ReminderRun.objects.get().finished_at)
+
+        report = send_overdue_task_reminders()
+        self.assertEqual(report['sent'], 2)
+        recipients = [message.to[0] for message in mail.outbox]
+        self.assertEqual(len(recipients), len(set(recipients)))
+
+
+class PriorityRankTestCase(TestCase):
+    """Tests for the denormalized priority rank"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+
+    def ranks(self):
+        return dict(Task.objects.values_list('title', 'priority_rank'))
+
+    def test_rank_follows_priority(self):
+        """Test every write path keeps priority_rank in sync"""
+        task = Task.objects.create(user=self.user, title='saved', priority='high')
+        Task.objects.bulk_create([Task(user=self.user, title='bulk', priority='low')])
+        self.assertEqual(self.ranks(), {'saved': 0, 'bulk': 2})
+
+        task.priority = 'low'
+        task.save(update_fields=['priority'])
+        Task.objects.filter(title='bulk').update(priority='medium')
+        self.assertEqual(self.ranks(), {'saved': 2, 'bulk': 1})
+
+    def test_task_list_priority_order(self):
+        """Test task_list sorts high, medium, low, then by due date"""
+        today = timezone.localdate()
+        for title, priority, days in [
+            ('low', 'low', 0), ('high later', 'high', 5),
+            ('medium', 'medium', 1), ('high soon', 'high', 1),
+        ]:
+            Task.objects.create(
+                user=self.user, title=title, priority=priority,
+                due_date=today + timedelta(days=days),
+            )
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(
+            reverse('task_list'), {'filter': 'week', 'sort': 'priority', 'page_size': 3}
+        )
+        self.assertEqual(
+            [task.title for task in response.context['tasks']],
+            ['high soon', 'high later', 'medium'],
+        )
+        response = self.client.get(reverse('task_list'), {
+            'filter': 'week', 'sort': 'priority',
+            'cursor': response.context['page']['next_cursor'],
+        })
+        self.assertEqual([task.title for task in response.context['tasks']], ['low'])
+
+    def test_admin_orders_by_rank(self):
+        """Test the admin priority column sorts by rank"""
+        for priority in ['low', 'high', 'medium']:
+            Task.objects.create(user=self.user, title=priority, priority=priority)
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'adminpass')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:core_task_changelist'), {'o': '2'})
+        self.assertEqual(
+            [task.title for task in response.context['cl'].result_list],
+            ['high', 'medium', 'low'],
+        )
+
+
+class TaskListRowsTestCase(TestCase):
+    """Tests for the SQL-annotated task_list rows"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.today = timezone.localdate()
+        for title, status, days in [
+            ('overdue', 'todo', -1), ('done late', 'done', -1),
+            ('due today', 'doing', 0), ('no date', 'todo', None),
+        ]:
+            Task.objects.create(
+                user=self.user, title=title, status=status,
+                description='long text ' * 100,
+                due_date=None if days is None else self.today + timedelta(days=days),
+            )
+
+    def test_annotations_match_model_methods(self):
+        """Test SQL is_overdue/is_complete agree with the Task methods"""
+        rows = {row.title: row for row in Task.objects.for_list(self.today)}
+        for task in Task.objects.all():
+            self.assertEqual(rows[task.title].is_overdue, task.is_overdue())
+            self.assertEqual(rows[task.title].is_complete, task.is_complete())
+
+    def test_rows_are_lightweight(self):
+        """Test rows are tuples carrying only the listed columns"""
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(Task.objects.filter(user=self.user).for_list(self.today))
+        self.assertNotIn('description', queries[0]['sql'])
+        self.assertIsInstance(rows[0], tuple)
+        self.assertNotIsInstance(rows[0], Task)
+
+    def test_task_list_renders_rows(self):
+        """Test task_list marks overdue and completed rows"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('task_list'), {'filter': 'all'})
+        self.assertContains(response, '<span class="overdue">⚠️ overdue </span>', html=True)
+        self.assertContains(response, '<span class="done">✅ done late</span>', html=True)
+        self.assertNotContains(response, '⚠️ done late')
+
+
+class TaskRowCacheTestCase(TestCase):
+    """Tests for cached task_list row fragments"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.today = timezone.localdate()
+        self.tasks = [
+            Task.objects.create(
+                user=self.user, title=f'Task {i}', due_date=self.today + timedelta(days=i)
+            )
+            for i in range(3)
+        ]
+
+    def render(self, today=None):
+        today = today or self.today
+        rows = list(Task.objects.filter(user=self.user).order_by('id').for_list(today))
+        before = fragment_cache_info()
+        html = render_task_rows(rows, today)
+        after = fragment_cache_info()
+        return html, after['hits'] - before['hits'], after['misses'] - before['misses']
+
+    def test_second_render_hits(self):
+        """Test unchanged rows come from the cache"""
+        first, hits, misses = self.render()
+        self.assertEqual((hits, misses), (0, 3))
+        second, hits, misses = self.render()
+        self.assertEqual((hits, misses), (3, 0))
+        self.assertEqual(first, second)
+        self.assertGreater(fragment_cache_info()['hit_ratio'], 0)
+
+    def test_writes_invalidate_their_rows(self):
+        """Test saves and bulk updates re-render only the changed rows"""
+        self.render()
+        task = self.tasks[0]
+        task.title = 'Renamed'
+        task.save()
+        html, hits, misses = self.render()
+        self.assertEqual((hits, misses), (2, 1))
+        self.assertIn('Renamed', html[0])
+
+        Task.objects.filter(pk=self.tasks[1].pk).update(status='done')
+        html, hits, misses = self.render()
+        self.assertEqual((hits, misses), (2, 1))
+        self.assertIn('✅', html[1])
+
+    def test_overdue_flips_at_midnight(self):
+        """Test a new day re-renders rows so overdue markers are current"""
+        html, _, _ = self.render()
+        self.assertNotIn('⚠️', html[0])
+        html, hits, misses = self.render(self.today + timedelta(days=1))
+        self.assertEqual((hits, misses), (0, 3))
+        self.assertIn('⚠️', html[0])
+
+
+class TaskApiTestCase(TestCase):
+    """Tests for the JSON task API"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        self.today = timezone.localdate()
+        self.tasks = [
+            Task.objects.create(
+                user=self.user, title=f'Task {i}', priority=priority,
+                due_date=self.today + timedelta(days=i),
+            )
+            for i, priority in enumerate(['low', 'high', 'medium', 'high', 'low'])
+        ]
+        self.foreign = Task.objects.create(user=self.other, title='Not mine')
+        self.client.login(username='testuser', password='testpass123')
+
+    def send(self, method, url, data):
+        return getattr(self.client, method)(
+            url, json.dumps(data), content_type='application/json'
+        )
+
+    def test_requires_login(self):
+        """Test anonymous requests get a JSON 401, not a redirect"""
+        self.client.logout()
+        response = self.client.get(reverse('api_task_list'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['error'], 'authentication required')
+
+    def test_list_is_scoped_and_paginated(self):
+        """Test listing walks only the user's tasks, page by page"""
+        url = reverse('api_task_list')
+        seen = []
+        cursor = None
+        while True:
+            params = {'page_size': 2}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get(url, params).json()
+            seen += [row['id'] for row in data['results']]
+            cursor = data['next']
+            if not cursor:
+                break
+        self.assertEqual(seen, [task.pk for task in self.tasks])
+        self.assertNotIn(self.foreign.pk, seen)
+
+    def test_sparse_fieldsets(self):
+        """Test ?fields= limits both the columns read and the output"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('api_task_list'), {'fields': 'title', 'sort': 'priority'}
+            )
+        rows = response.json()['results']
+        self.assertEqual(rows[0], {'title': 'Task 1'})
+        self.assertEqual([row['title'] for row in rows[:2]], ['Task 1', 'Task 3'])
+        select = [q['sql'] for q in queries if 'core_task' in q['sql']][-1]
+        self.assertNotIn('description', select)
+
+    def test_unknown_field_is_rejected(self):
+        """Test ?fields= with an unknown name is a 400"""
+        response = self.client.get(reverse('api_task_list'), {'fields': 'title,user__password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('user__password', response.json()['error'])
+
+    def test_list_query_count_is_flat(self):
+        """Test a page costs the same queries however many tasks it holds"""
+        Task.objects.bulk_create(
+            Task(user=self.user, title=f'Bulk {i}') for i in range(200)
+        )
+        url = reverse('api_task_list')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url, {'page_size': 1})
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(url, {'page_size': 200})
+        self.assertEqual(len(small), len(large))
+
+    def test_create(self):
+        """Test POST creates a task for the user with model defaults"""
+        response = self.send('post', reverse('api_task_list'), {'title': 'New', 'status': 'done'})
+        self.assertEqual(response.status_code, 201)
+        task = Task.objects.get(pk=response.json()['id'])
+        self.assertEqual(task.user, self.user)
+        self.assertEqual(task.priority, 'medium')
+        self.assertIsNotNone(task.completed_at)
+
+    def test_create_validates(self):
+        """Test invalid bodies get a 400 with form errors"""
+        url = reverse('api_task_list')
+        response = self.send('post', url, {'title': 'x', 'status': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.json()['errors'])
+        response = self.client.post(url, 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_retrieve_patch_put_delete(self):
+        """Test detail operations on the user's own task"""
+        task = self.tasks[0]
+        url = reverse('api_task_detail', args=[task.pk])
+        self.assertEqual(self.client.get(url).json()['title'], 'Task 0')
+
+        response = self.send('patch', url, {'status': 'doing'})
+        self.assertEqual(response.status_code, 200)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.title, task.priority), ('doing', 'Task 0', 'low'))
+
+        response = self.send('put', url, {'title': 'Replaced', 'status': 'todo', 'priority': 'high'})
+        self.assertEqual(response.json()['title'], 'Replaced')
+        task.refresh_from_db()
+        self.assertIsNone(task.due_date)
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(Task.objects.filter(pk=task.pk).exists())
+
+    def test_other_users_tasks_are_not_found(self):
+        """Test detail operations on another user's task 404"""
+        url = reverse('api_task_detail', args=[self.foreign.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.send('patch', url, {'title': 'Mine now'}).status_code, 404)
+        self.assertEqual(self.client.delete(url).status_code, 404)
+        self.assertTrue(Task.objects.filter(pk=self.foreign.pk, title='Not mine').exists())
+
+
+class ImportTasksTestCase(TestCase):
+    """Tests for the import_tasks command"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        path = Path(self.tmp.name) / name
+        path.write_text(text)
+        return str(path)
+
+    def run_import(self, path, *args):
+        out = StringIO()
+        call_command('import_tasks', path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_csv_import(self):
+        """Test valid CSV rows are created with form defaults and rollups"""
+        path = self.write('tasks.csv', (
+            'title,status,priority,due_date,user\n'
+            'Write report,todo,high,2026-01-05,\n'
+            'Ship it,done,,,otheruser\n'
+            'Old win,done,low,,\n'
+        ))
+        output = self.run_import(path, '--user', 'testuser', '--batch-size', '2')
+        self.assertIn('Imported 3 tasks', output)
+        self.assertIn('rows/s', output)
+
+        report = Task.objects.get(title='Write report')
+        self.assertEqual((report.user, report.priority_rank), (self.user, 0))
+        shipped = Task.objects.get(title='Ship it')
+        self.assertEqual((shipped.user, shipped.priority), (self.other, 'medium'))
+        self.assertIsNotNone(shipped.completed_at)
+        self.assertIsNone(report.completed_at)
+        self.assertEqual(
+            DailyCompletion.objects.get(user=self.user).count, 1
+        )
+
+    def test_rejected_rows_go_to_error_file(self):
+        """Test invalid rows are reported and the rest still imported"""
+        path = self.write('tasks.jsonl', '\n'.join([
+            json.dumps({'title': 'Good', 'completed_at': '2026-01-02 10:00', 'status': 'done'}),
+            json.dumps({'title': 'Bad status', 'status': 'someday'}),
+            'not json',
+            json.dumps({'status': 'todo'}),
+            json.dumps({'title': 'Nobody', 'user': 'ghost'}),
+            json.dumps({'title': 'Also good', 'due_date': '2026-02-01'}),
+        ]))
+        errors_path = str(Path(self.tmp.name) / 'errors.jsonl')
+        output = self.run_import(path, '--user', 'testuser', '--errors', errors_path)
+
+        self.assertIn('Imported 2 tasks', output)
+        self.assertIn('Rejected 4 rows', output)
+        good = Task.objects.get(title='Good')
+        self.assertEqual(good.completed_at.date().isoformat(), '2026-01-02')
+
+        with open(errors_path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r['line'] for r in records], [2, 3, 4, 5])
+        self.assertIn('status', records[0]['errors'])
+        self.assertIn('title', records[2]['errors'])
+        self.assertIn('user', records[3]['errors'])
+
+    def test_batches_are_bulk_inserts(self):
+        """Test rows are inserted in batch-sized statements"""
+        path = self.write('tasks.jsonl', '\n'.join(
+            json.dumps({'title': f'Task {i}'}) for i in range(10)
+        ))
+        with CaptureQueriesContext(connection) as queries:
+            self.run_import(path, '--user', 'testuser', '--batch-size', '4')
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "core_task"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(Task.objects.count(), 10)
+
+    def test_unknown_format(self):
+        """Test a file without a known extension needs --format"""
+        path = self.write('tasks.txt', 'title\nA\n')
+        with self.assertRaises(CommandError):
+            self.run_import(path, '--user', 'testuser')
+        self.run_import(path, '--user', 'testuser', '--format', 'csv')
+        self.assertTrue(Task.objects.filter(title='A').exists())
+
+
+class TaskExportTestCase(TestCase):
+    """Tests for the streaming task export"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        self.today = timezone.localdate()
+        self.task = Task.objects.create(
+            user=self.user, title='Write, "quoted"', status='done',
+            due_date=self.today, completed_at=timezone.now(),
+        )
+        Task.objects.create(user=self.user, title='Second')
+        Task.objects.create(user=self.other, title='Not mine')
+        self.client.login(username='testuser', password='testpass123')
+
+    def export(self, **params):
+        response = self.client.get(reverse('task_export'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_export_is_scoped(self):
+        """Test the CSV export holds only the user's tasks"""
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment', response['Content-Disposition'])
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual([row['title'] for row in rows], ['Write, "quoted"', 'Second'])
+        self.assertEqual(rows[0]['due_date'], self.today.isoformat())
+        self.assertEqual(rows[1]['completed_at'], '')
+
+    def test_jsonl_export(self):
+        """Test the JSONL export has one object per task"""
+        _, body = self.export(format='jsonl')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['id'], self.task.pk)
+        self.assertIsNotNone(rows[0]['completed_at'])
+
+    def test_bad_format(self):
+        """Test an unknown format is a 400"""
+        response = self.client.get(reverse('task_export'), {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_header_is_sent_before_querying(self):
+        """Test the first chunk goes out before any rows are fetched"""
+        response = self.client.get(reverse('task_export'))
+        content = iter(response.streaming_content)
+        with CaptureQueriesContext(connection) as queries:
+            first = next(content)
+        self.assertTrue(first.startswith(b'id,title'))
+        self.assertEqual(len(queries), 0)
+
+    def test_command_round_trips_through_import(self):
+        """Test the all-users export can be re-imported as-is"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = str(Path(tmp.name) / 'tasks.csv')
+        call_command('export_tasks', '--output', path, stderr=StringIO())
+        Task.objects.all().delete()
+
+        call_command('import_tasks', path, stdout=StringIO())
+        self.assertEqual(
+            sorted(Task.objects.values_list('user__username', 'title')),
+            [('otheruser', 'Not mine'), ('testuser', 'Second'), ('testuser', 'Write, "quoted"')],
+        )
+        self.assertTrue(Task.objects.get(title='Second').updated_at)
+
+    def test_command_to_stdout(self):
+        """Test the command streams JSONL to stdout filtered by user"""
+        out = StringIO()
+        call_command('export_tasks', '--format', 'jsonl', '--user', 'otheruser', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(r['user'], r['title']) for r in rows], [('otheruser', 'Not mine')])
+
+
+class TaskBulkActionTestCase(TestCase):
+    """Tests for task_list bulk actions"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        self.tasks = [
+            Task.objects.create(user=self.user, title=f'Task {i}') for i in range(5)
+        ]
+        self.foreign = Task.objects.create(user=self.other, title='Not mine')
+        self.client.login(username='testuser', password='testpass123')
+
+    def bulk(self, operation, tasks, **extra):
+        return self.client.post(reverse('task_bulk'), {
+            'operation': operation, 'ids': [task.pk for task in tasks], **extra,
+        })
+
+    def writes(self, queries, table='core_task'):
+        return [
+            q['sql'] for q in queries
+            if q['sql'].startswith(('UPDATE "%s"' % table, 'DELETE FROM "%s"' % table))
+        ]
+
+    def test_mark_done_is_one_update(self):
+        """Test mark done sets status and completed_at in one statement"""
+        stats = cached_task_completion_stats(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.bulk('done', self.tasks[:3] + [self.foreign])
+        # check before assertRedirects' request resets the query log
+        self.assertEqual(len(self.writes(queries)), 1)
+        self.assertRedirects(response, reverse('task_list'))
+
+        done = Task.objects.filter(status='done')
+        self.assertEqual(set(done), set(self.tasks[:3]))
+        self.assertFalse(done.filter(completed_at__isnull=True).exists())
+        self.assertEqual(
+            DailyCompletion.objects.get(user=self.user).count, 3
+        )
+        self.assertNotEqual(cached_task_completion_stats(self.user), stats)
+
+    def test_mark_done_keeps_earlier_completion(self):
+        """Test already completed tasks keep their completed_at"""
+        earlier = timezone.now() - timedelta(days=3)
+        Task.objects.filter(pk=self.tasks[0].pk).update(status='doing', completed_at=earlier)
+        self.bulk('done', self.tasks[:2])
+        self.tasks[0].refresh_from_db()
+        self.assertEqual(self.tasks[0].completed_at, earlier)
+
+    def test_status_and_priority(self):
+        """Test status and priority changes keep derived columns in step"""
+        self.bulk('done', self.tasks[:2])
+        with CaptureQueriesContext(connection) as queries:
+            self.bulk('status:todo', self.tasks[:1])
+            self.bulk('priority:high', self.tasks[1:3])
+        self.assertEqual(len(self.writes(queries)), 2)
+        self.assertEqual(DailyCompletion.objects.get(user=self.user).count, 1)
+        self.assertEqual(
+            sorted(Task.objects.filter(priority_rank=0).values_list('title', flat=True)),
+            ['Task 1', 'Task 2'],
+        )
+
+    def test_delete_is_one_statement(self):
+        """Test bulk delete runs a single scoped DELETE and fixes rollups"""
+        self.bulk('done', self.tasks[:2])
+        with CaptureQueriesContext(connection) as queries:
+            self.bulk('delete', self.tasks[1:4] + [self.foreign])
+        self.assertEqual(len(self.writes(queries)), 1)
+        self.assertEqual(
+            list(Task.objects.filter(user=self.user).order_by('id')),
+            [self.tasks[0], self.tasks[4]],
+        )
+        self.assertTrue(Task.objects.filter(pk=self.foreign.pk).exists())
+        self.assertEqual(DailyCompletion.objects.get(user=self.user).count, 1)
+
+    def test_rejects_unknown_operations(self):
+        """Test unknown operations and values are a 400 and change nothing"""
+        for operation in ['archive', 'status:someday', 'priority:urgent']:
+            response = self.bulk(operation, self.tasks)
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Task.objects.exclude(status='todo').exists())
+        self.assertEqual(self.client.get(reverse('task_bulk')).status_code, 405)
+
+    def test_rejects_non_numeric_ids(self):
+        """Test a non-numeric id is a 400, not a server error"""
+        response = self.client.post(reverse('task_bulk'), {
+            'operation': 'done', 'ids': [self.tasks[0].pk, 'abc'],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Task.objects.filter(status='done').exists())
+
+    def test_redirects_back_to_safe_next(self):
+        """Test the view returns to the list page it was posted from"""
+        response = self.bulk('done', self.tasks[:1], next='/tasks/?filter=all')
+        self.assertRedirects(response, '/tasks/?filter=all')
+        response = self.bulk('done', self.tasks[:1], next='https://evil.example/')
+        self.assertRedirects(response, reverse('task_list'))
+
+    def test_task_list_has_checkboxes(self):
+        """Test task_list rows can be selected for bulk actions"""
+        response = self.client.get(reverse('task_list'), {'filter': 'all'})
+        self.assertContains(response, 'form="bulk-form"', count=5)
+        self.assertContains(response, 'value="priority:high"')
+
+
+class TaskSearchTestCase(QueryPlanMixin, TestCase):
+    """Tests for full-text task search"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        self.report = Task.objects.create(
+            user=self.user, title='Quarterly report', description='Draft the report'
+        )
+        self.invoice = Task.objects.create(
+            user=self.user, title='Send invoices', description='Attach the quarterly report'
+        )
+        Task.objects.create(user=self.user, title='Water plants')
+        Task.objects.create(user=self.other, title='Quarterly report', description='report')
+
+    def search(self, query, user=None):
+        tasks = Task.objects.filter(user=user or self.user)
+        return list(search_tasks(tasks, query).values_list('title', flat=True))
+
+    def test_ranked_and_scoped(self):
+        """Test matches are ranked by bm25 and limited to the user"""
+        self.assertEqual(self.search('report'), ['Quarterly report', 'Send invoices'])
+        self.assertEqual(self.search('quarterly invoices'), ['Send invoices'])
+        self.assertEqual(self.search('plants', user=self.other), [])
+
+    def test_prefix_and_syntax(self):
+        """Test the last word matches as a prefix and FTS syntax is inert"""
+        self.assertEqual(self.search('quart'), ['Quarterly report', 'Send invoices'])
+        self.assertEqual(self.search('report" OR "plants'), [])
+        self.assertEqual(self.search('  '), [])
+
+    def test_index_follows_writes(self):
+        """Test saves, queryset updates and deletes keep the index in sync"""
+        self.report.title = 'Annual summary'
+        self.report.description = ''
+        self.report.save()
+        Task.objects.filter(pk=self.invoice.pk).update(title='Send receipts')
+        self.assertEqual(self.search('report'), ['Send receipts'])
+        self.assertEqual(self.search('annual'), ['Annual summary'])
+        Task.objects.filter(pk=self.invoice.pk).delete()
+        self.assertEqual(self.search('receipts'), [])
+
+    def test_no_table_scan(self):
+        """Test the search is driven by the index, not a scan of core_task"""
+        with self.assertNoTableScans():
+            self.search('report')
+
+    def test_fallback_without_fts(self):
+        """Test other backends fall back to icontains"""
+        with mock.patch('core.services.search.search_available', return_value=False):
+            self.assertEqual(
+                sorted(self.search('quarterly report')), ['Quarterly report', 'Send invoices']
+            )
+            self.assertEqual(self.search('plants'), ['Water plants'])
+
+    def test_rebuild_command(self):
+        """Test the rebuild command restores a lost index and its triggers"""
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER core_task_fts_insert')
+            cursor.execute("INSERT INTO core_task_fts(core_task_fts) VALUES ('delete-all')")
+        self.assertEqual(self.search('report'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 4 tasks', out.getvalue())
+        Task.objects.create(user=self.user, title='New report')
+        self.assertEqual(len(self.search('report')), 3)
+
+    def test_task_list_search(self):
+        """Test the task_list search box shows ranked matches"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('task_list'), {'q': 'report', 'filter': 'all'})
+        self.assertEqual(
+            [row.title for row in response.context['tasks']],
+            ['Quarterly report', 'Send invoices'],
+        )
+        self.assertContains(response, 'value="report"')
+
+
+class BenchmarkCommandTestCase(TestCase):
+    """Tests for the seed_data and bench commands"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_data(self):
+        """Test seeded users get realistic, repeatable backlogs"""
+        out = StringIO()
+        call_command('seed_data', '--users', '2', '--tasks', '300', '--batch-size', '250', stdout=out)
+        self.assertIn('with 600 tasks', out.getvalue())
+        self.assertEqual(
+            list(User.objects.values_list('username', flat=True).order_by('username')),
+            ['bench00000', 'bench00001'],
+        )
+        statuses = dict(
+            Task.objects.values_list('status').annotate(n=Count('id')).order_by()
+        )
+        self.assertEqual(set(statuses), {'todo', 'doing', 'done'})
+        self.assertGreater(statuses['todo'], statuses['doing'])
+        self.assertFalse(Task.objects.filter(status='done', completed_at__isnull=True).exists())
+        self.assertTrue(Task.objects.filter(due_date__lt=timezone.localdate()).exists())
+        self.assertTrue(Task.objects.filter(due_date__isnull=True).exists())
+        self.assertEqual(
+            sum(DailyCompletion.objects.values_list('count', flat=True)), statuses['done']
+        )
+        self.assertTrue(self.client.login(username='bench00001', password='bench-password'))
+
+        # more users continue the numbering
+        call_command('seed_data', '--users', '1', '--tasks', '0', stdout=StringIO())
+        self.assertTrue(User.objects.filter(username='bench00002').exists())
+
+    def test_bench_writes_json_report(self):
+        """Test bench reports latency percentiles, queries and memory per scenario"""
+        call_command('seed_data', '--users', '1', '--tasks', '40', stdout=StringIO())
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = str(Path(tmp.name) / 'bench.json')
+        call_command(
+            'bench', '--iterations', '3', '--warmup', '1', '--output', path,
+            '--scenario', 'task_list', '--scenario', 'task_create',
+            '--scenario', 'send_overdue_emails',
+            stderr=StringIO(),
+        )
+        with open(path) as f:
+            report = json.load(f)
+        self.assertEqual(report['dataset']['user'], 'bench00000')
+        self.assertEqual(set(report['results']), {'task_list', 'task_create', 'send_overdue_emails'})
+        result = report['results']['task_list']
+        for key in ['p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_kb']:
+            self.assertIn(key, result)
+        self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertGreater(result['queries'], 0)
+        # writes are rolled back between iterations
+        self.assertEqual(Task.objects.count(), 40)
+        self.assertFalse(Task.objects.filter(last_reminded_at__isnull=False).exists())
+
+    def test_bench_rejects_unknown_scenario(self):
+        """Test bench lists the scenarios when given an unknown one"""
+        call_command('seed_data', '--users', '1', '--tasks', '1', stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'choose from task_list'):
+            call_command('bench', '--scenario', 'nope', stdout=StringIO(), stderr=StringIO())
+
+
+class ServerTimingTestCase(QueryBudgetMixin, TestCase):
+    """Tests for request timing, Server-Timing and query budgets"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        today = timezone.localdate()
+        Task.objects.bulk_create(
+            Task(
+                user=self.user, title=f'Task {i}', status=['todo', 'doing', 'done'][i % 3],
+                due_date=today + timedelta(days=i - 10),
+                completed_at=timezone.now() if i % 3 == 2 else None,
+            )
+            for i in range(30)
+        )
+        self.task = Task.objects.filter(user=self.user).first()
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_server_timing_header(self):
+        """Test responses carry query count and db/template/total durations"""
+        response = self.client.get(reverse('task_list'))
+        header = response['Server-Timing']
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(header, r'tpl;dur=[\d.]+')
+        self.assertRegex(header, r'total;dur=[\d.]+')
+        timings = response.wsgi_request.timings
+        self.assertGreater(timings.queries, 0)
+        self.assertGreater(timings.templates, 0)
+        self.assertGreaterEqual(timings.total, timings.templates)
+
+    def test_over_budget_is_logged(self):
+        """Test requests over their budget are logged with the route name"""
+        budgets = {'*': {'queries': 100}, 'task_list': {'queries': 1, 'ms': 10000}}
+        with self.settings(REQUEST_BUDGETS=budgets):
+            with self.assertLogs('core.middleware', 'WARNING') as logs:
+                self.client.get(reverse('task_list'))
+            self.assertIn('(task_list) over budget', logs.output[0])
+            with self.assertNoLogs('core.middleware', 'WARNING'):
+                self.client.get(reverse('stats'))
+
+    def test_every_route_within_query_budget(self):
+        """Test each route in core.urls stays within its query budget"""
+        for pattern in core_urls.urlpatterns:
+            kwargs = {'pk': self.task.pk} if 'pk' in pattern.pattern.converters else {}
+            url = reverse(pattern.name, kwargs=kwargs)
+            with self.subTest(route=pattern.name):
+                self.client.force_login(self.user)
+                response = self.assertQueryBudget(pattern.name, lambda: self.client.get(url))
+                self.assertLess(response.status_code, 500)
+
+    def test_every_write_within_query_budget(self):
+        """Test each route in core.urls that writes stays within its write budget"""
+        tasks = list(Task.objects.filter(user=self.user).exclude(status='done')[:4])
+        form = {'title': 'Changed', 'status': 'done', 'priority': 'high'}
+        writes = [
+            ('task_create', 'post', {}, form),
+            ('task_update', 'post', {'pk': tasks[0].pk}, form),
+            ('task_delete', 'post', {'pk': tasks[1].pk}, {}),
+            ('task_bulk', 'post', {}, {'operation': 'done', 'ids': [tasks[2].pk]}),
+            ('api_task_list', 'post', {}, json.dumps(form)),
+            ('api_task_detail', 'patch', {'pk': tasks[3].pk}, json.dumps({'status': 'done'})),
+            ('api_task_detail', 'delete', {'pk': tasks[3].pk}, None),
+            ('job_enqueue', 'post', {}, {'name': 'export_tasks'}),
+            ('logout', 'post', {}, {}),
+        ]
+        for name, method, kwargs, data in writes:
+            url = reverse(name, kwargs=kwargs)
+            extra = {'content_type': 'application/json'} if name.startswith('api_') else {}
+            with self.subTest(route=name, method=method):
+                self.client.force_login(self.user)
+                response = self.assertQueryBudget(
+                    name,
+                    lambda: getattr(self.client, method)(url, data, **extra),
+                    method.upper(),
+                )
+                self.assertLess(response.status_code, 400)
+
+
+class MetricsTestCase(TestCase):
+    """Tests for the in-process metrics and /metrics"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.staff = User.objects.create_user(
+            username='staffuser',
+            password='testpass123',
+            is_staff=True,
+        )
+        self.client.login(username='staffuser', password='testpass123')
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def sample(self, text, line_prefix):
+        for line in text.splitlines():
+            if line.startswith(line_prefix + ' '):
+                return float(line.rsplit(' ', 1)[1])
+        return 0.0
+
+    def test_access(self):
+        """Test /metrics is for staff or allowed addresses only"""
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.login(username='testuser', password='testpass123')
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.logout()
+        with self.settings(METRICS_ALLOWED_IPS=['127.0.0.1']):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_request_counters_and_histogram(self):
+        """Test requests are counted by route and status, with latency buckets"""
+        counter = 'http_requests_total{route="stats",method="GET",status="2xx"}'
+        count = 'http_request_duration_seconds_count{route="stats"}'
+        before = self.scrape()
+        self.client.get(reverse('stats'))
+        self.client.get(reverse('stats'))
+        self.client.get('/no-such-page/')
+        after = self.scrape()
+        self.assertEqual(self.sample(after, counter) - self.sample(before, counter), 2)
+        self.assertEqual(self.sample(after, count) - self.sample(before, count), 2)
+        self.assertIn('route="unmatched",method="GET",status="4xx"', after)
+        self.assertIn('http_request_duration_seconds_bucket{route="stats",le="+Inf"}', after)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', after)
+
+    def test_cache_and_reminder_counters(self):
+        """Test stats cache lookups and reminder sends are exported"""
+        hits = 'stats_cache_requests_total{result="hit"}'
+        sent = 'reminder_emails_sent_total'
+        before = self.scrape()
+        cached_task_completion_stats(self.user)
+        cached_task_completion_stats(self.user)
+        Task.objects.create(
+            user=self.user, title='Late', due_date=timezone.localdate() - timedelta(days=2)
+        )
+        send_overdue_task_reminders(connection=LocmemEmailBackend())
+        after = self.scrape()
+        self.assertEqual(self.sample(after, hits) - self.sample(before, hits), 1)
+        self.assertEqual(self.sample(after, sent) - self.sample(before, sent), 1)
+
+    def test_aggregates_other_processes(self):
+        """Test snapshots written by other processes are added in"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        counter = 'http_requests_total{route="task_list",method="GET",status="2xx"}'
+        bucket = 'http_request_duration_seconds_bucket{route="task_list",le="0.01"}'
+        with self.settings(METRICS_DIR=tmp.name):
+            before = self.scrape()
+            other = {
+                'http_requests_total': [[['task_list', 'GET', '2xx'], 5]],
+                'http_request_duration_seconds': [
+                    [['task_list'], [[2, 3] + [0] * 10, 0.03]],
+                ],
+            }
+            with open(Path(tmp.name) / 'metrics-999-1.json', 'w') as f:
+                json.dump(other, f)
+            metrics.flush()
+            self.assertTrue(any(p.name.startswith('metrics-') and p.name != 'metrics-999-1.json'
+                                for p in Path(tmp.name).iterdir()))
+            after = self.scrape()
+        self.assertEqual(self.sample(after, counter) - self.sample(before, counter), 5)
+        self.assertEqual(self.sample(after, bucket) - self.sample(before, bucket), 5)
+
+    def test_exited_processes_are_folded(self):
+        """Test files of exited processes are merged into one and deleted, counted once"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        directory = Path(tmp.name)
+        counter = 'http_requests_total{route="task_list",method="GET",status="2xx"}'
+
+        def write(name, count):
+            with open(directory / name, 'w') as f:
+                json.dump({'http_requests_total': [[['task_list', 'GET', '2xx'], count]]}, f)
+
+        with self.settings(METRICS_DIR=tmp.name):
+            before = self.sample(self.scrape(), counter)
+            # pids above the default pid_max of 4194304 can't be running
+            write('metrics-999999999-1.json', 2)
+            write('metrics-999999998-1.json', 3)
+            write(f'metrics-{os.getppid()}-1.json', 4)  # still running
+            self.assertEqual(self.sample(self.scrape(), counter) - before, 9)
+            self.assertEqual(
+                sorted(p.name for p in directory.glob('metrics-*')),
+                [f'metrics-{os.getppid()}-1.json', 'metrics-retired.json'],
+            )
+            self.assertEqual(self.sample(self.scrape(), counter) - before, 9)
+
+            # folded, but deleting it failed last time: not counted twice
+            write('metrics-999999998-1.json', 3)
+            self.assertEqual(self.sample(self.scrape(), counter) - before, 9)
+            self.assertFalse((directory / 'metrics-999999998-1.json').exists())
+
+
+@override_settings(ROOT_URLCONF='config.asgi_urls')
+class AsyncViewsTestCase(TestCase):
+    """Tests for the async views served under ASGI"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        today = timezone.localdate()
+        Task.objects.bulk_create(
+            Task(
+                user=self.user, title=f'Task {i}', status=['todo', 'doing', 'done'][i % 3],
+                due_date=today + timedelta(days=i - 10),
+                completed_at=timezone.now() - timedelta(days=i) if i % 3 == 2 else None,
+            )
+            for i in range(30)
+        )
+        self.task = Task.objects.filter(user=self.user).first()
+        self.client.login(username='testuser', password='testpass123')
+        self.async_client.cookies = self.client.cookies
+
+    def test_urlconf_mirrors_sync_routes(self):
+        """Test the ASGI urlconf has every route, with async views for the reads"""
+        self.assertEqual(
+            [(str(p.pattern), p.name) for p in async_urls.urlpatterns],
+            [(str(p.pattern), p.name) for p in core_urls.urlpatterns],
+        )
+        views = {p.name: p.callback for p in async_urls.urlpatterns}
+        self.assertIs(views['stats'], async_views.stats_view)
+        sync_views = {p.name: p.callback for p in core_urls.urlpatterns}
+        self.assertIs(views['task_create'], sync_views['task_create'])
+
+    async def test_login_required(self):
+        """Test anonymous requests are redirected, or get 401 from the API"""
+        client = type(self.async_client)()
+        response = await client.get(reverse('task_list'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response['Location'])
+        response = await client.get(reverse('api_task_list'))
+        self.assertEqual(response.status_code, 401)
+
+    def async_get(self, url, params=None, **kwargs):
+        return async_to_sync(self.async_client.get)(url, params or {}, **kwargs)
+
+    def assertSameAsSync(self, url, params, keys):
+        with override_settings(ROOT_URLCONF='config.urls'):
+            wsgi_response = self.client.get(url, params)
+        self.assertEqual(wsgi_response.status_code, 200)
+        response = self.async_get(url, params)
+        self.assertEqual(response.status_code, 200)
+        for key in keys:
+            self.assertEqual(response.context[key], wsgi_response.context[key], key)
+        return response
+
+    def test_task_list_matches_sync(self):
+        """Test the async task list renders the same page as the sync one"""
+        url = reverse('task_list')
+        for params in [{'filter': 'all'}, {'filter': 'all', 'sort': 'priority'},
+                       {'filter': 'all', 'page_size': 5}, {'q': 'Task 1'}]:
+            with self.subTest(**params):
+                response = self.assertSameAsSync(url, params, ['tasks', 'filter_type', 'sort_type'])
+                self.assertContains(response, 'Task 1')
+
+    def test_first_search_in_process(self):
+        """Test a search before anything checked for the FTS index works under ASGI"""
+        search._search_ready.clear()
+        response = self.async_get(reverse('task_list'), {'q': 'Task 1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Task 1')
+
+    def test_stats_matches_sync(self):
+        """Test the async stats page gathers the same numbers as the sync one"""
+        response = self.assertSameAsSync(reverse('stats'), {}, ['stats'])
+        self.assertNotContains(response, 'id="productivityInitial"')
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    def test_productivity_conditional(self):
+        """Test the async productivity endpoint keeps its validators"""
+        url = reverse('stats_productivity')
+        response = self.async_get(url, {'days': 30})
+        self.assertEqual(response.status_code, 200)
+        with override_settings(ROOT_URLCONF='config.urls'):
+            self.assertEqual(response.json(), self.client.get(url, {'days': 30}).json())
+        self.assertIn('private', response['Cache-Control'])
+        again = self.async_get(url, {'days': 30}, headers={'if-none-match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.async_get(url, {'days': 'x'}).status_code, 400)
+
+    async def test_export_streams(self):
+        """Test the async export streams every task"""
+        response = await self.async_client.get(reverse('task_export'))
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(
+            b''.join([chunk async for chunk in response]).decode().splitlines()
+        ))
+        self.assertEqual(len(rows), 31)
+
+    async def test_api(self):
+        """Test the async API reads, and writes falling through to the sync views"""
+        response = await self.async_client.get(reverse('api_task_list'), {'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNotNone(data['next'])
+
+        response = await self.async_client.get(reverse('api_task_detail', args=[self.task.pk]))
+        self.assertEqual(response.json()['title'], self.task.title)
+        other = await Task.objects.acreate(user=self.other, title='Theirs')
+        response = await self.async_client.get(reverse('api_task_detail', args=[other.pk]))
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.async_client.patch(
+            reverse('api_task_detail', args=[self.task.pk]),
+            {'title': 'Renamed'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        await self.task.arefresh_from_db()
+        self.assertEqual(self.task.title, 'Renamed')
+
+
+class AsyncServerTimingTestCase(TransactionTestCase):
+    """Tests for query timing of async views on a real event loop"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        Task.objects.bulk_create(
+            Task(user=self.user, title=f'Task {i}', due_date=timezone.localdate())
+            for i in range(5)
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.async_client.cookies = self.client.cookies
+
+    def test_queries_in_worker_threads_are_counted(self):
+        """Test queries the async ORM runs in executor threads count for the request"""
+        for name in ['task_list', 'stats', 'api_task_list']:
+            with self.subTest(route=name):
+                # asyncio.run, unlike async_to_sync, does not send ORM calls
+                # back to this thread
+                response = asyncio.run(self.async_client.get(reverse(name)))
+                self.assertEqual(response.status_code, 200)
+                queries = int(re.search(r'desc="(\d+) queries"', response['Server-Timing'])[1])
+                self.assertGreater(queries, 0)
+
+
+class SqliteProfileTestCase(TestCase):
+    """Tests for the SQLite pragma profile and its commands"""
+
+    def test_profile_applied_to_connections(self):
+        """Test SQLITE_PRAGMAS is in effect on the test database's connection"""
+        report = {name: (actual, ok) for name, _, actual, ok in pragma_report(connection)}
+        self.assertEqual(set(report), set(settings.SQLITE_PRAGMAS))
+        for name in ['synchronous', 'busy_timeout', 'cache_size', 'temp_store']:
+            self.assertTrue(report[name][1], name)
+        self.assertEqual(report['busy_timeout'][0], 5000)
+        self.assertEqual(report['temp_store'][0], 2)
+
+    def test_wal_on_database_file(self):
+        """Test the profile switches a database file to WAL"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        db = sqlite3.connect(Path(tmp.name) / 'db.sqlite3')
+        self.addCleanup(db.close)
+        apply_pragmas(db, settings.SQLITE_PRAGMAS)
+        self.assertEqual(
+            pragmas_in_effect(db, ['journal_mode', 'synchronous', 'mmap_size']),
+            {'journal_mode': 'wal', 'synchronous': 1, 'mmap_size': 268435456},
+        )
+
+    def test_invalid_pragma_rejected(self):
+        """Test values that are not plain words or numbers are refused"""
+        with self.assertRaises(ImproperlyConfigured):
+            apply_pragmas(connection.connection, {'cache_size': '1; DROP TABLE core_task'})
+
+    def test_sqlite_pragmas_command(self):
+        """Test the report lists configured and other pragmas, and --strict fails on mismatches"""
+        out = StringIO()
+        call_command('sqlite_pragmas', stdout=out)
+        lines = {line.split()[0]: line.split()[1:] for line in out.getvalue().splitlines()[2:]}
+        self.assertEqual(lines['busy_timeout'], ['5000', '5000', 'ok'])
+        self.assertEqual(lines['foreign_keys'], ['-', '1'])
+        with self.settings(SQLITE_PRAGMAS={'busy_timeout': 1}):
+            with self.assertRaisesMessage(CommandError, 'Not in effect: busy_timeout'):
+                call_command('sqlite_pragmas', '--strict', stdout=StringIO())
+
+    def test_optimize_db(self):
+        """Test optimize_db runs PRAGMA optimize, and ANALYZE when asked"""
+        out = StringIO()
+        call_command('optimize_db', '--analyze', stdout=out)
+        self.assertIn('Ran ANALYZE and PRAGMA optimize', out.getvalue())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class ConcurrencyBenchmarkTestCase(TransactionTestCase):
+    """Tests for the bench_concurrency and bench_db commands"""
+
+    def test_reports_both_modes(self):
+        """Test WSGI and ASGI throughput is reported for every route"""
+        cache.clear()
+        call_command('seed_data', '--users', '1', '--tasks', '20', stdout=StringIO())
+        out = StringIO()
+        call_command(
+            'bench_concurrency', '--requests', '4', '--concurrency', '2',
+            stdout=out, stderr=StringIO(),
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['user'], 'bench00000')
+        self.assertEqual(
+            set(report['results']), {'task_list', 'stats_view', 'productivity_data', 'api_task_list'}
+        )
+        for result in report['results'].values():
+            self.assertEqual(set(result), {'wsgi', 'asgi'})
+            self.assertGreater(result['asgi']['requests_per_second'], 0)
+
+    def test_bench_db_compares_profiles(self):
+        """Test bench_db runs the mixed workload with and without the profile"""
+        call_command('seed_data', '--users', '2', '--tasks', '20', stdout=StringIO())
+        out = StringIO()
+        call_command(
+            'bench_db', '--threads', '2', '--seconds', '0.2', stdout=out, stderr=StringIO()
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report['results']), {'default', 'profile'})
+        for result in report['results'].values():
+            self.assertGreater(result['reads'], 0)
+            self.assertGreater(result['writes'], 0)
+        self.assertIsNotNone(report['speedup'])
+        # the copies were edited, not the database itself
+        self.assertFalse(Task.objects.filter(title__startswith='Edited by').exists())
+
+
+class ReplicaRoutingTestCase(TransactionTestCase):
+    """Tests for the read replica router and primary pinning"""
+
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        today = timezone.localdate()
+        Task.objects.bulk_create(
+            Task(user=self.user, title=f'Task {i}', due_date=today + timedelta(days=i))
+            for i in range(5)
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    @contextmanager
+    def capture(self):
+        with CaptureQueriesContext(connections['default']) as primary:
+            with CaptureQueriesContext(connections['replica']) as replica:
+                yield primary, replica
+
+    def task_queries(self, captured):
+        return [q['sql'] for q in captured if '"core_task"' in q['sql']]
+
+    def test_list_reads_go_to_replica(self):
+        """Test task_list, the API list and export read tasks from the replica"""
+        with self.settings(READ_REPLICAS=['replica']):
+            for url in [reverse('task_list'), reverse('api_task_list'), reverse('task_export')]:
+                with self.subTest(url=url), self.capture() as (primary, replica):
+                    response = self.client.get(url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertTrue(self.task_queries(replica))
+                    self.assertFalse(self.task_queries(primary))
+        # without replicas everything reads from default
+        with self.capture() as (primary, replica):
+            self.client.get(reverse('task_list'))
+        self.assertTrue(self.task_queries(primary))
+        self.assertEqual(len(replica), 0)
+
+    def test_stats_read_replica_once_caught_up(self):
+        """Test stats computed right after a change read the primary, later the replica"""
+        with self.settings(READ_REPLICAS=['replica']):
+            with self.capture() as (primary, replica):
+                self.client.get(reverse('stats'))
+            self.assertTrue(self.task_queries(primary))
+            self.assertEqual(len(replica), 0)
+
+            cache.clear()
+            with self.settings(REPLICA_PIN_SECONDS=0), self.capture() as (primary, replica):
+                self.client.get(reverse('stats'))
+            self.assertTrue(self.task_queries(replica))
+            self.assertFalse(self.task_queries(primary))
+
+    def test_write_pins_client_to_primary(self):
+        """Test a request that writes sends the client's next reads to the primary"""
+        with self.settings(READ_REPLICAS=['replica']):
+            response = self.client.post(reverse('task_create'), {
+                'title': 'New', 'status': 'todo', 'priority': 'medium',
+            })
+            self.assertEqual(response.status_code, 302)
+            self.assertIn(PIN_COOKIE, response.cookies)
+            self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 30)
+
+            with self.capture() as (primary, replica):
+                self.client.get(reverse('task_list'))
+            self.assertTrue(self.task_queries(primary))
+            self.assertFalse(self.task_queries(replica))
+
+            # expired or garbled cookies don't pin
+            for value in ['0', 'nope']:
+                self.client.cookies[PIN_COOKIE] = value
+                with self.capture() as (primary, replica):
+                    self.client.get(reverse('task_list'))
+                self.assertTrue(self.task_queries(replica))
+
+        response = self.client.post(reverse('task_create'), {
+            'title': 'Newer', 'status': 'todo', 'priority': 'medium',
+        })
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_async_views_use_replica(self):
+        """Test the async views read from the replica and honour the pin"""
+        async_client = self.async_client_class()
+        async_client.cookies = self.client.cookies
+        with self.settings(READ_REPLICAS=['replica'], ROOT_URLCONF='config.asgi_urls'):
+            with self.capture() as (primary, replica):
+                response = async_to_sync(async_client.get)(reverse('task_list'))
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(self.task_queries(replica))
+            self.assertFalse(self.task_queries(primary))
+
+            async_client.cookies[PIN_COOKIE] = str(int(time.time()) + 60)
+            with self.capture() as (primary, replica):
+                async_to_sync(async_client.get)(reverse('task_list'))
+            self.assertTrue(self.task_queries(primary))
+            self.assertFalse(self.task_queries(replica))
+
+    def test_writes_go_to_primary(self):
+        """Test instances read from the replica are saved to the primary"""
+        task = Task.objects.using('replica').first()
+        with self.capture() as (primary, replica):
+            task.title = 'Renamed'
+            task.save()
+        self.assertTrue(any(q['sql'].startswith('UPDATE') for q in primary))
+        self.assertFalse(any(q['sql'].startswith('UPDATE') for q in replica))
+        self.assertFalse(router.allow_migrate('replica', 'core'))
+        self.assertTrue(router.allow_migrate('default', 'core'))
+
+    def test_sync_replica(self):
+        """Test sync_replica copies the primary into the replica's file"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = str(Path(tmp.name) / 'replica.sqlite3')
+        with mock.patch.dict(connections['replica'].settings_dict, {'NAME': path}):
+            out = StringIO()
+            call_command('sync_replica', stdout=out)
+        self.assertIn('to replica', out.getvalue())
+        db = sqlite3.connect(path)
+        self.addCleanup(db.close)
+        self.assertEqual(db.execute('SELECT count(*) FROM core_task').fetchone()[0], 5)
+        with self.assertRaisesMessage(CommandError, 'not in REPLICA_DATABASES'):
+            call_command('sync_replica', '--database', 'default', stdout=StringIO())
+
+
+class SessionAuthCacheTestCase(TestCase):
+    """Tests for cached sessions and the cached logged-in user"""
+
+    def setUp(self):
+        cache.clear()
+        caches['sessions'].clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        Task.objects.create(user=self.user, title='Task')
+        self.client.login(username='testuser', password='testpass123')
+
+    def tables(self, captured):
+        return [
+            table for table in ['django_session', 'auth_user']
+            if any(f'"{table}"' in q['sql'] for q in captured)
+        ]
+
+    def test_warm_requests_skip_session_and_user_queries(self):
+        """Test cached requests drop the session and user queries"""
+        url = reverse('task_list')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as cached:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.tables(cached), [])
+
+        with self.settings(
+            SESSION_ENGINE='django.contrib.sessions.backends.db', AUTH_USER_CACHE_TIMEOUT=0
+        ):
+            # a new client, since the middleware picks the engine when loaded
+            client = Client()
+            client.force_login(self.user)
+            client.get(url)
+            with CaptureQueriesContext(connection) as uncached:
+                client.get(url)
+        self.assertEqual(self.tables(uncached), ['django_session', 'auth_user'])
+        self.assertLessEqual(len(cached), len(uncached) - 2)
+
+    def test_async_requests_use_cached_user(self):
+        """Test request.auser() reads the cached user too"""
+        self.async_client.cookies = self.client.cookies
+        get = async_to_sync(self.async_client.get)
+        with self.settings(ROOT_URLCONF='config.asgi_urls'):
+            get(reverse('stats'))
+            with CaptureQueriesContext(connection) as captured:
+                response = get(reverse('stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.tables(captured), [])
+
+    def test_logout_view_ends_cached_session(self):
+        """Test the session cookie stops working after logout_view"""
+        self.client.get(reverse('task_list'))
+        cookie = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.client.get(reverse('logout'))
+
+        other = Client()
+        other.cookies[settings.SESSION_COOKIE_NAME] = cookie
+        response = other.get(reverse('task_list'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIsNone(caches['sessions'].get(f'auth:user:{cookie}'))
+
+    def test_password_change_logs_out_other_sessions(self):
+        """Test a password change keeps this session and ends the others"""
+        other = Client()
+        other.login(username='testuser', password='testpass123')
+        self.assertEqual(other.get(reverse('task_list')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('task_list')).status_code, 200)
+
+        # password hashing is slow on purpose; keep it out of the budget log
+        with self.settings(REQUEST_WRITE_BUDGETS={}):
+            response = self.client.post(reverse('password_change'), {
+                'old_password': 'testpass123',
+                'new_password1': 'a-much-longer-passphrase',
+                'new_password2': 'a-much-longer-passphrase',
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.client.get(reverse('task_list')).status_code, 200)
+        self.assertEqual(other.get(reverse('task_list')).status_code, 302)
+
+    def test_deactivated_user_is_logged_out(self):
+        """Test saving the user invalidates its cached copy"""
+        self.assertEqual(self.client.get(reverse('task_list')).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('task_list')).status_code, 302)
+
+
+class JobQueueTestCase(TestCase):
+    """Tests for the background job queue and its views"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        Task.objects.create(user=self.user, title='Exported', due_date=timezone.localdate())
+        self.client.login(username='testuser', password='testpass123')
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = self.settings(JOB_EXPORT_DIR=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.calls = []
+
+        @jobs.handler('test_flaky')
+        def flaky(job):
+            self.calls.append(job.attempts)
+            raise RuntimeError('still broken')
+
+        self.addCleanup(jobs._handlers.pop, 'test_flaky')
+
+    def test_claim_and_run(self):
+        """Test a claimed job runs once and stores its result"""
+        with self.assertRaisesMessage(ValueError, "unknown job 'nope'"):
+            jobs.enqueue('nope')
+        job = jobs.enqueue('reconcile_completions')
+        claimed = jobs.claim('worker-1')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, 'running')
+        self.assertEqual(claimed.attempts, 1)
+        self.assertTrue(claimed.locked_by.startswith('worker-1/'))
+        # nobody else gets it while it runs
+        self.assertIsNone(jobs.claim('worker-2'))
+
+        self.assertEqual(jobs.run(claimed), 'done')
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.result['users'], 1)
+        self.assertEqual(job.locked_by, '')
+        self.assertIsNone(jobs.claim('worker-2'))
+
+    def test_expired_lease_is_reclaimed(self):
+        """Test a job whose worker vanished is run again, and the old worker can't finish it"""
+        jobs.enqueue('reconcile_completions')
+        lost = jobs.claim('worker-1')
+        Job.objects.filter(pk=lost.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        again = jobs.claim('worker-2')
+        self.assertEqual(again.pk, lost.pk)
+        self.assertEqual(again.attempts, 2)
+
+        jobs.run(lost)
+        again.refresh_from_db()
+        self.assertEqual(again.status, 'running')
+        jobs.run(again)
+        again.refresh_from_db()
+        self.assertEqual(again.status, 'done')
+
+    def test_expired_leases_stop_at_max_attempts(self):
+        """Test a job that keeps losing its worker fails after max_attempts"""
+        job = jobs.enqueue('reconcile_completions', max_attempts=2)
+        claims = 0
+        while (claimed := jobs.claim()) is not None:
+            claims += 1
+            self.assertLessEqual(claims, 2)
+            Job.objects.filter(pk=claimed.pk).update(
+                locked_until=timezone.now() - timedelta(seconds=1)
+            )
+        job.refresh_from_db()
+        self.assertEqual(claims, 2)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.status, 'failed')
+        self.assertIsNotNone(job.finished_at)
+        self.assertIn('Lease ran out', job.last_error)
+
+    def test_retries_with_backoff_then_fails(self):
+        """Test failing jobs are retried later, each wait longer, until max_attempts"""
+        job = jobs.enqueue('test_flaky', max_attempts=3)
+        waits = []
+        with self.settings(JOB_RETRY_BACKOFF=10):
+            for _ in range(3):
+                claimed = jobs.claim()
+                self.assertIsNotNone(claimed)
+                before = timezone.now()
+                jobs.run(claimed)
+                job.refresh_from_db()
+                if job.status == 'queued':
+                    waits.append((job.run_after - before).total_seconds())
+                    self.assertIsNone(jobs.claim())  # not due yet
+                    Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(self.calls, [1, 2, 3])
+        self.assertEqual(len(waits), 2)
+        self.assertTrue(10 <= waits[0] < 11.5)
+        self.assertTrue(20 <= waits[1] < 22.5)
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('RuntimeError: still broken', job.last_error)
+
+    def test_run_records_metrics(self):
+        """Test throughput and queue lag are exported as metrics"""
+        jobs.enqueue('reconcile_completions')
+        jobs.run(jobs.claim())
+        text = metrics.render()
+        self.assertIn('jobs_processed_total{name="reconcile_completions",outcome="done"}', text)
+        self.assertIn('job_queue_lag_seconds_count{name="reconcile_completions"}', text)
+        self.assertIn('job_duration_seconds_count{name="reconcile_completions"}', text)
+
+    def test_export_job_from_view(self):
+        """Test an export queued from a view can be polled and downloaded"""
+        response = self.client.post(reverse('job_enqueue'), {'name': 'export_tasks'})
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertEqual(data['status'], 'queued')
+        self.assertEqual(response['Location'], data['url'])
+        self.assertNotIn('download', self.client.get(data['url']).json())
+        self.assertEqual(
+            self.client.get(reverse('job_download', args=[data['id']])).status_code, 404
+        )
+
+        jobs.run(jobs.claim())
+        data = self.client.get(data['url']).json()
+        self.assertEqual(data['status'], 'done')
+        self.assertNotIn('path', data['result'])
+        response = self.client.get(data['download'])
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['title'] for row in rows], ['Exported'])
+        response.close()
+
+        # other users can't see it
+        User.objects.create_user(username='other', password='testpass123')
+        self.client.login(username='other', password='testpass123')
+        self.assertEqual(self.client.get(data['url']).status_code, 404)
+
+    def test_enqueue_permissions(self):
+        """Test only staff can queue reminder and rollup jobs"""
+        url = reverse('job_enqueue')
+        self.assertEqual(self.client.post(url, {'name': 'send_overdue_reminders'}).status_code, 403)
+        self.assertEqual(self.client.post(url, {'name': 'nope'}).status_code, 400)
+        self.assertEqual(
+            self.client.post(url, {'name': 'export_tasks', 'format': 'xml'}).status_code, 400
+        )
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertFalse(Job.objects.exists())
+
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.user.refresh_from_db()
+        self.user.save()  # drop the cached user
+        response = self.client.post(url, {'name': 'reconcile_completions', 'user': 'testuser'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Job.objects.get().payload, {'usernames': ['testuser']})
+
+    def test_failed_export_leaves_no_temp_file(self):
+        """Test an export that raises while writing removes its temp file"""
+        jobs.enqueue('export_tasks', {'format': 'csv'}, user=self.user, max_attempts=1)
+
+        def broken(queryset, fmt):
+            yield 'id,title\r\n'
+            raise RuntimeError('disk full')
+
+        with mock.patch.object(jobs, 'export_lines', broken):
+            self.assertEqual(jobs.run(jobs.claim()), 'failed')
+        self.assertEqual(list(Path(settings.JOB_EXPORT_DIR).iterdir()), [])
+
+    def test_prune_exports(self):
+        """Test old exports and stale temp files are deleted, recent ones kept"""
+        directory = Path(settings.JOB_EXPORT_DIR)
+        now = time.time()
+        ages = {
+            'tasks-1.csv': settings.JOB_EXPORT_RETENTION + 60,
+            'tasks-2.csv': 60,
+            '.export-old': settings.JOB_LEASE_SECONDS + 60,
+            '.export-new': 60,
+            'notes.txt': settings.JOB_EXPORT_RETENTION + 60,
+        }
+        for name, age in ages.items():
+            path = directory / name
+            path.write_text('x')
+            os.utime(path, (now - age, now - age))
+
+        job = jobs.enqueue('prune_exports')
+        self.assertEqual(jobs.run(jobs.claim()), 'done')
+        job.refresh_from_db()
+        self.assertEqual(job.result, {'deleted': 2})
+        self.assertEqual(
+            sorted(p.name for p in directory.iterdir()),
+            ['.export-new', 'notes.txt', 'tasks-2.csv'],
+        )
+        self.assertEqual(jobs.prune_exports(), 0)
+
+
+class JobWorkerTestCase(TransactionTestCase):
+    """Tests for the run_worker command"""
+
+    def test_burst_runs_every_due_job(self):
+        """Test the worker runs each due job exactly once and reports lag"""
+        cache.clear()
+        call_command('seed_data', '--users', '3', '--tasks', '5', stdout=StringIO())
+        for _ in range(12):
+            jobs.enqueue('reconcile_completions')
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        user = User.objects.first()
+        with self.settings(JOB_EXPORT_DIR=tmp.name):
+            export = jobs.enqueue('export_tasks', {'format': 'jsonl'}, user=user)
+            out = StringIO()
+            # one thread: the shared-cache in-memory test database fails
+            # concurrent writers with "table is locked" instead of waiting
+            call_command(
+                'run_worker', '--burst', '--concurrency', '1', '--prune',
+                stdout=out, stderr=StringIO(),
+            )
+        self.assertIn('Ran 13 jobs', out.getvalue())
+        self.assertIn('queue lag p50', out.getvalue())
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {'done'})
+        self.assertEqual(set(Job.objects.values_list('attempts', flat=True)), {1})
+        export.refresh_from_db()
+        lines = Path(export.result['path']).read_text().splitlines()
+        self.assertEqual(len(lines), 5)
+
@@ -0,0 +1,97 @@
+"""
+Per-request timing: SQL query count and time, template render time and
+total time, collected by core.middleware.ServerTimingMiddleware.
+"""
+import time
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+_current = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.templates = 0.0
+        self.total = 0.0
+        self._rendering = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def header(self):
+        """Server-Timing value, durations in milliseconds."""
+        return ", ".join([
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+            f"tpl;dur={self.templates * 1000:.1f}",
+            f"total;dur={self.total * 1000:.1f}",
+        ])
+
+
+def current_timings():
+    """The RequestTimings of the request being handled, if any."""
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper counting the query for the current request, if any."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.record_query(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    # Installed on every connection, in whichever thread opens it: the
+    # async ORM runs queries on the executor thread's own connections,
+    # and the request's timings follow it there through the context var.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def start_timings():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop_timings(token):
+    _current.reset(token)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return super().render(context, request)
+        # Only the outermost render counts; queries it triggers (lazy
+        # querysets in the template) are counted as db time too.
+        timings._rendering += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings._rendering -= 1
+            if not timings._rendering:
+                timings.templates += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing each render for Server-Timing."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
@@ -1,5 +1,6 @@
 from django.urls import path
 from .views import *
+from . import api
 
 urlpatterns = [
     path("", home, name="home"),
@@ -7,6 +8,15 @@ urlpatterns = [
     path("tasks/new/", task_create, name="task_create"),
     path("tasks/<int:pk>/edit/", task_update, name="task_update"),
     path("tasks/<int:pk>/delete/", task_delete, name="task_delete"),
+    path("tasks/export/", task_export, name="task_export"),
+    path("tasks/bulk/", task_bulk, name="task_bulk"),
     path("stats/", stats_view, name="stats"),
+    path("stats/productivity/", productivity_data, name="stats_productivity"),
+    path("api/tasks/", api.task_collection, name="api_task_list"),
+    path("api/tasks/<int:pk>/", api.task_detail, name="api_task_detail"),
+    path("jobs/", job_enqueue, name="job_enqueue"),
+    path("jobs/<int:pk>/", job_detail, name="job_detail"),
+    path("jobs/<int:pk>/download/", job_download, name="job_download"),
+    path("metrics", metrics_view, name="metrics"),
     path("logout/", logout_view, name="logout"),
 ]
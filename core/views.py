@@ -1,14 +1,40 @@
 from django.shortcuts import render,redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
+from django.contrib import messages
 from .models import *
 from .forms import TaskForm
+from django.conf import settings
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.urls import reverse
 from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils.http import url_has_allowed_host_and_scheme
 import json
 from django.utils.safestring import mark_safe
+from core import jobs, metrics
+from core.routers import replica_alias
+from core.services.exports import EXPORT_CONTENT_TYPES, EXPORT_FORMATS, export_lines
+from core.services.fragments import render_task_rows
+from core.services.pagination import keyset_page, requested_page_size
+from core.services.search import search_tasks
 from core.services.stats import (
-    task_completion_stats,
-    weekly_productivity,
+    PRODUCTIVITY_RANGES,
+    cached_task_completion_stats,
+    cached_weekly_productivity,
+    stats_last_modified,
+    stats_version,
 )
 
 # Create your views here.
@@ -56,44 +82,293 @@ def task_delete(request, pk):
         return redirect("task_list")
     return render(request, "core/task_confirm_delete.html", {"task": task})
 
-@login_required
-def task_list(request):
+def task_list_params(request, today):
+    """
+    The filtered tasks and paging options of a task_list request; shared
+    with the async view in core.async_views.
+    """
     filter_type = request.GET.get("filter", "week")
     sort_type = request.GET.get("sort", "due_date")
 
-    tasks = Task.objects.filter(user=request.user)
+    tasks = Task.objects.using(replica_alias()).filter(user=request.user)
     
     if filter_type == "today":
-        tasks = tasks.filter(due_date=timezone.now().date())
+        tasks = tasks.filter(due_date=today)
     elif filter_type == "week":
         tasks = tasks.filter(
-            due_date__lte=timezone.now().date() + timezone.timedelta(days=7)
+            due_date__lte=today + timezone.timedelta(days=7)
         )
     elif filter_type == "done":
         tasks = tasks.filter(status="done")
-    if sort_type == "due_date":
-        tasks = tasks.order_by("due_date")
-    elif sort_type == "priority":
-        tasks = tasks.order_by("priority")
-    else: tasks = tasks.order_by("priority")
 
+    query = request.GET.get("q", "").strip()
+    page_size = requested_page_size(
+        request, settings.TASK_LIST_PAGE_SIZE, settings.TASK_LIST_MAX_PAGE_SIZE
+    )
+    # ranked by relevance, so there is no key to page on; show the best
+    # matches only
+    search = search_tasks(tasks, query).for_list(today)[:page_size] if query else None
+    return {
+        "filter_type": filter_type,
+        "sort_type": sort_type,
+        "query": query,
+        "tasks": tasks.for_list(today),
+        "search": search,
+        "keys": TASK_SORT_KEYS.get(sort_type, TASK_SORT_KEYS["priority"]),
+        "cursor": request.GET.get("cursor"),
+        "page_size": page_size,
+    }
+
+
+def search_page(rows, params):
+    return {
+        "object_list": rows,
+        "next_cursor": None,
+        "prev_cursor": None,
+        "page_size": params["page_size"],
+    }
+
+
+def task_list_context(params, page, task_rows):
+    return {
+        "tasks": page["object_list"],
+        "task_rows": task_rows,
+        "page": page,
+        "filter_type": params["filter_type"],
+        "sort_type": params["sort_type"],
+        "query": params["query"],
+        "status_choices": Task.STATUS_CHOICES,
+        "priority_choices": Task.PRIORITY_CHOICES,
+    }
+
+
+@login_required
+def task_list(request):
+    today = timezone.localdate()
+    params = task_list_params(request, today)
+    if params["search"] is not None:
+        page = search_page(list(params["search"]), params)
+    else:
+        page = keyset_page(
+            params["tasks"],
+            params["keys"],
+            cursor=params["cursor"],
+            page_size=params["page_size"],
+        )
+    task_rows = render_task_rows(page["object_list"], today)
     return render(
-        request,
-        "core/task_list.html",
-        {"tasks": tasks, "filter_type": filter_type, "sort_type": sort_type},
+        request, "core/task_list.html", task_list_context(params, page, task_rows)
     )
 
 
+@login_required
+@require_POST
+def task_bulk(request):
+    """
+    Apply one action to the selected tasks with a single UPDATE or DELETE.
+    ``operation`` is "done", "delete", "status:<status>" or
+    "priority:<priority>".
+    """
+    operation, _, value = request.POST.get("operation", "").partition(":")
+    try:
+        ids = [int(pk) for pk in request.POST.getlist("ids")]
+    except ValueError:
+        return HttpResponseBadRequest("invalid task id")
+    tasks = Task.objects.filter(user=request.user, pk__in=ids)
+    if operation == "status" and value == "done":
+        operation = "done"
+
+    if operation == "done":
+        # keep the original completion time of tasks that were done before
+        count = tasks.exclude(status="done").update(
+            status="done",
+            completed_at=Coalesce(F("completed_at"), Value(timezone.now())),
+        )
+    elif operation == "status" and value in dict(Task.STATUS_CHOICES):
+        count = tasks.update(status=value)
+    elif operation == "priority" and value in dict(Task.PRIORITY_CHOICES):
+        count = tasks.update(priority=value)
+    elif operation == "delete":
+        count, _ = tasks.delete()
+    else:
+        return HttpResponseBadRequest("unknown bulk operation")
+
+    verb = "Deleted" if operation == "delete" else "Updated"
+    messages.success(request, f"{verb} {count} task{'s' if count != 1 else ''}.")
+
+    next_url = request.POST.get("next")
+    if not url_has_allowed_host_and_scheme(
+        next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+    ):
+        next_url = "task_list"
+    return redirect(next_url)
+
+
+def productivity_payload(days, data):
+    return {
+        "days": days,
+        "total": sum(item["count"] for item in data["result"]),
+        "result": data["result"],
+    }
+
+
+def stats_context(stats):
+    return {"stats": stats, "productivity_ranges": PRODUCTIVITY_RANGES}
+
+
 @login_required
 def stats_view(request):
-    print(weekly_productivity(request.user))
+    # the chart fetches its series from stats_productivity
     return render(
-        request,
-        "core/stats.html",
-        {
-            "stats": task_completion_stats(request.user),
-            "weekly_data": (weekly_productivity(request.user)),
-        },
+        request, "core/stats.html", stats_context(cached_task_completion_stats(request.user))
+    )
+
+
+def productivity_etag(request):
+    # The dense series shifts at midnight, so the day is part of the tag.
+    days = request.GET.get("days", "7")
+    return f"{stats_version(request.user)}-{days}-{timezone.localdate()}"
+
+
+def productivity_last_modified(request):
+    midnight = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(stats_last_modified(request.user), midnight)
+
+
+def productivity_days(request):
+    """?days= as one of PRODUCTIVITY_RANGES, or None."""
+    try:
+        days = int(request.GET.get("days", 7))
+    except ValueError:
+        return None
+    return days if days in PRODUCTIVITY_RANGES else None
+
+
+def bad_productivity_days():
+    allowed = ", ".join(map(str, PRODUCTIVITY_RANGES))
+    return JsonResponse({"error": f"days must be one of {allowed}"}, status=400)
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(
+    etag_func=productivity_etag,
+    last_modified_func=productivity_last_modified,
+)
+def productivity_data(request):
+    days = productivity_days(request)
+    if days is None:
+        return bad_productivity_days()
+
+    data = cached_weekly_productivity(request.user, days=days, dense=True)
+    return JsonResponse(productivity_payload(days, data))
+
+
+@login_required
+def task_export(request):
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("format must be csv or jsonl")
+    # Rows are written as they come off the database cursor, so memory use
+    # does not grow with the number of tasks.
+    response = StreamingHttpResponse(
+        export_lines(Task.objects.using(replica_alias()).filter(user=request.user), fmt),
+        content_type=EXPORT_CONTENT_TYPES[fmt],
+    )
+    response["Content-Disposition"] = f'attachment; filename="tasks.{fmt}"'
+    return response
+
+
+# jobs anyone can queue for their own tasks; the rest are staff only
+USER_JOBS = {"export_tasks"}
+STAFF_JOBS = {"send_overdue_reminders", "reconcile_completions", "prune_exports"}
+
+
+def job_payload(job):
+    data = {
+        "id": job.pk,
+        "name": job.name,
+        "status": job.status,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+        "url": reverse("job_detail", args=[job.pk]),
+    }
+    if job.status == "done":
+        # minus server paths
+        data["result"] = {k: v for k, v in (job.result or {}).items() if k != "path"}
+        if job.name == "export_tasks":
+            data["download"] = reverse("job_download", args=[job.pk])
+    elif job.last_error:
+        data["error"] = job.last_error.strip().splitlines()[-1]
+    return data
+
+
+@login_required
+@require_POST
+def job_enqueue(request):
+    """
+    Queue a background job instead of doing the work in the request.
+    Returns 202 with the job; poll its url until it is done.
+    """
+    name = request.POST.get("name")
+    if name in USER_JOBS:
+        fmt = request.POST.get("format", "csv")
+        if fmt not in EXPORT_FORMATS:
+            return JsonResponse({"error": "format must be csv or jsonl"}, status=400)
+        job = jobs.enqueue(name, {"format": fmt}, user=request.user)
+    elif name in STAFF_JOBS:
+        if not request.user.is_staff:
+            return HttpResponseForbidden()
+        payload = {}
+        if name == "reconcile_completions" and request.POST.getlist("user"):
+            payload["usernames"] = request.POST.getlist("user")
+        job = jobs.enqueue(name, payload, user=request.user)
+    else:
+        allowed = ", ".join(sorted(USER_JOBS | STAFF_JOBS))
+        return JsonResponse({"error": f"name must be one of {allowed}"}, status=400)
+    data = job_payload(job)
+    response = JsonResponse(data, status=202)
+    response["Location"] = data["url"]
+    return response
+
+
+def _own_job(request, pk):
+    jobs_visible = Job.objects.all() if request.user.is_staff else request.user.jobs.all()
+    return get_object_or_404(jobs_visible, pk=pk)
+
+
+@login_required
+def job_detail(request, pk):
+    return JsonResponse(job_payload(_own_job(request, pk)))
+
+
+@login_required
+def job_download(request, pk):
+    job = _own_job(request, pk)
+    if job.name != "export_tasks" or job.status != "done":
+        raise Http404("No finished export")
+    fmt = job.payload["format"]
+    try:
+        return FileResponse(
+            open(jobs.export_path(job), "rb"),
+            as_attachment=True,
+            filename=f"tasks.{fmt}",
+            content_type=EXPORT_CONTENT_TYPES[fmt],
+        )
+    except FileNotFoundError:
+        raise Http404("Export file is gone")
+
+
+def metrics_view(request):
+    # staff, or scrapers on METRICS_ALLOWED_IPS (without logging in)
+    allowed = request.user.is_staff or (
+        request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
     )
 
 def logout_view(request):